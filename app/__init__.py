@@ -3,8 +3,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from config import Config
+from app.database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
@@ -22,14 +23,27 @@ def create_app(config_class=Config):
     def index():
         return redirect(url_for('events.list_events'))
 
+    from app.database import configure_engines, configure_sqlite
+    from app.metrics import init_metrics
+    from app.querybudget import init_lazy_load_guard
+    configure_engines(app)
     db.init_app(app)
     migrate.init_app(app, db)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_sqlite(app, engine)
+        init_metrics(app, db.engines.values())
+    init_lazy_load_guard(app)
     login_manager.init_app(app)
 
-    from app.models import User
+    # Registers the ORM hook that keeps per-event order stats current
+    from app import stats
+    from app.identity import load_identity
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Cached snapshot, so logged-in page views skip the user SELECT
+        return load_identity(int(user_id))
 
     # Register blueprints
     from app.routes import auth, admin, events, payment, orders
@@ -39,4 +53,13 @@ def create_app(config_class=Config):
     app.register_blueprint(payment.bp)
     app.register_blueprint(orders.bp)
 
+    from app.sweeper import expire_orders_command, start_sweeper
+    from app.screenshots import process_screenshots_command
+    from app.seed import seed_command
+    app.cli.add_command(expire_orders_command)
+    app.cli.add_command(process_screenshots_command)
+    app.cli.add_command(seed_command)
+    if app.config['ORDER_SWEEP_INTERVAL']:
+        start_sweeper(app)
+
     return app
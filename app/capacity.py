@@ -0,0 +1,22 @@
+from sqlalchemy import update, or_
+from app import db
+from app.models import Event
+
+def reserve_seat(event_id):
+    """Lock an event's seat counter if a seat is free; returns False if it is full.
+
+    The conditional UPDATE takes the row (or database) write lock, so
+    concurrent checkouts serialize here and can never push seats_taken past
+    capacity. The seat itself is counted when the caller flushes the order
+    holding it: app.stats moves seats_taken by one for every order that
+    starts or stops holding a seat, so the counter rises within the locked
+    transaction and failed, cancelled or deleted orders give their seat back.
+    """
+    result = db.session.execute(
+        update(Event)
+        .where(Event.id == event_id)
+        .where(or_(Event.capacity.is_(None), Event.seats_taken < Event.capacity))
+        .values(seats_taken=Event.seats_taken)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+from flask import current_app
+from sqlalchemy.orm import selectinload
+from app.cache import TTLCache
+from app.database import primary_reads
+from app.models import Event, EventStatus
+
+# Cache keys: the active listing, and one entry per event detail
+ACTIVE_EVENTS = 'active'
+
+def catalog_cache():
+    """Per-process cache of public event data, created on first use.
+
+    Admin edits invalidate it explicitly; other worker processes pick the
+    change up once CATALOG_CACHE_TTL expires. Entries are always filled from
+    the primary: a lagging replica would pin pre-edit data (and its ETag)
+    in the cache for the whole TTL.
+    """
+    cache = current_app.extensions.get('catalog_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('catalog_cache', TTLCache(
+            maxsize=current_app.config['CATALOG_CACHE_SIZE'],
+            ttl=current_app.config['CATALOG_CACHE_TTL']
+        ))
+    return cache
+
+def snapshot_event(event):
+    """Plain, session-independent copy of an event and its meal options."""
+    return SimpleNamespace(
+        id=event.id,
+        title=event.title,
+        description=event.description,
+        date=event.date,
+        location=event.location,
+        fee=event.fee,
+        admin_fee=event.admin_fee,
+        meal_required=event.meal_required,
+        capacity=event.capacity,
+        status=event.status,
+        image_url=event.image_url,
+        meal_options=[
+            SimpleNamespace(id=m.id, name=m.name, description=m.description)
+            for m in sorted(event.meal_options, key=lambda m: m.id)
+        ],
+        # Latest edit to the event or any of its meal options
+        updated_at=max(
+            (stamp for stamp in [event.updated_at] + [m.updated_at for m in event.meal_options] if stamp),
+            default=None
+        )
+    )
+
+def get_active_events():
+    """Active events sorted by date, served from cache when possible."""
+    cache = catalog_cache()
+    events = cache.get(ACTIVE_EVENTS)
+    if events is None:
+        with primary_reads():
+            events = [
+                snapshot_event(event) for event in
+                Event.query.options(selectinload(Event.meal_options))
+                .filter_by(status=EventStatus.ACTIVE)
+                .order_by(Event.date.asc()).all()
+            ]
+        cache.set(ACTIVE_EVENTS, events)
+    return events
+
+def get_event_detail(event_id):
+    """Snapshot of a single event, or None if it does not exist."""
+    cache = catalog_cache()
+    event = cache.get(event_id)
+    if event is None:
+        with primary_reads():
+            found = Event.query.options(selectinload(Event.meal_options)).filter_by(id=event_id).first()
+            if found is None:
+                return None
+            event = snapshot_event(found)
+        cache.set(event_id, event)
+    return event
+
+def invalidate_catalog(event_id=None):
+    """Drop the cached listing and, if given, one event's detail entry."""
+    cache = catalog_cache()
+    cache.pop(ACTIVE_EVENTS)
+    if event_id is not None:
+        cache.pop(event_id)
@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+
+class RoutingSession(Session):
+    """Session that sends SELECTs from @read_replica views to the replica bind.
+
+    Flushes and any non-SELECT statement always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context()
+                and g.get('use_read_replica') and REPLICA_BIND in self._db.engines
+                and (clause is None or getattr(clause, 'is_select', False))):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def read_replica(f):
+    """Serve this read-only view from the replica when one is configured.
+
+    Replication lag means a row written moments ago may not be visible yet,
+    so only use it on pages that tolerate slightly stale data.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.use_read_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+@contextmanager
+def primary_reads():
+    """Send the block's SELECTs to the primary, even inside a @read_replica view."""
+    if not has_app_context():
+        yield
+        return
+    previous = g.get('use_read_replica')
+    g.use_read_replica = False
+    try:
+        yield
+    finally:
+        g.use_read_replica = previous
+
+def engine_options(app, uri):
+    """Pool and timeout options for a server database; SQLite keeps its defaults."""
+    if uri.startswith('sqlite'):
+        return {}
+    options = {
+        'pool_size': app.config['DB_POOL_SIZE'],
+        'max_overflow': app.config['DB_MAX_OVERFLOW'],
+        'pool_pre_ping': app.config['DB_POOL_PRE_PING'],
+        'pool_recycle': app.config['DB_POOL_RECYCLE'],
+    }
+    timeout = app.config['DB_STATEMENT_TIMEOUT_MS']
+    if timeout and uri.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={int(timeout)}'}
+    return options
+
+def configure_engines(app):
+    """Fill in engine options and the replica bind; call before db.init_app."""
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS still win over the DB_* settings
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app, uri),
+        **(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    }
+    replica_uri = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if replica_uri:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = {'url': replica_uri, **engine_options(app, replica_uri)}
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+def configure_sqlite(app, engine):
+    """Apply SQLITE_PRAGMAS to every new connection of a SQLite engine.
+
+    The default profile (WAL journal, synchronous=NORMAL, a busy timeout and
+    larger page/mmap caches) lets checkout writes and admin approvals proceed
+    while other workers read, and makes writers wait for the lock instead of
+    failing with "database is locked".
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
@@ -0,0 +1,219 @@
+import csv
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import StringIO
+from openpyxl import Workbook
+from sqlalchemy import and_, or_
+from app import db
+from app.models import User, Event, MealOption, Order, ExportJob, ExportStatus
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+CSV_HEADER = ('Order ID', 'Date', 'Customer', 'Telephone', 'Event', 'Meal Option', 'Amount', 'Admin Fee', 'Total', 'Status', 'Payment Method', 'Screenshot')
+XLSX_HEADER = ['Order ID', 'Date', 'Customer Name', 'Customer Tel', 'Meal', 'Amount', 'Admin Fee', 'Total', 'Status', 'Payment Method', 'Screenshot']
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def export_rows_query(event_id=None, by_event=False):
+    """Flat export rows with customer, event and meal columns joined in.
+
+    Newest orders first; by_event groups them by event (newest event first),
+    as write_orders_workbook needs.
+    """
+    query = db.session.query(
+        Order.id,
+        Order.event_id,
+        Event.date.label('event_date'),
+        Order.created_at,
+        Order.amount,
+        Order.admin_fee,
+        Order.status,
+        Order.payment_method,
+        Order.payment_screenshot,
+        User.name.label('customer_name'),
+        User.telephone.label('customer_telephone'),
+        Event.title.label('event_title'),
+        MealOption.name.label('meal_name')
+    ).join(User, Order.user_id == User.id)\
+        .join(Event, Order.event_id == Event.id)\
+        .outerjoin(MealOption, Order.meal_option_id == MealOption.id)
+    if event_id is not None:
+        query = query.filter(Order.event_id == event_id)
+    if by_event:
+        query = query.order_by(Event.date.desc(), Event.id)
+    return query.order_by(Order.created_at.desc(), Order.id.desc())
+
+def iter_export_batches(event_id=None, batch_size=EXPORT_BATCH_SIZE, by_event=False):
+    """Yield export rows as fully-fetched lists, paging on (created_at, id),
+    or on (event date, event id, created_at, id) when grouped by_event.
+
+    Unlike yield_per, no cursor stays open between batches, so callers may
+    commit (e.g. job progress) in between.
+    """
+    query = export_rows_query(event_id, by_event)
+    last = None
+    while True:
+        page = query
+        if last is not None:
+            after = or_(
+                Order.created_at < last.created_at,
+                and_(Order.created_at == last.created_at, Order.id < last.id)
+            )
+            if by_event:
+                after = or_(
+                    Event.date < last.event_date,
+                    and_(Event.date == last.event_date, or_(
+                        Order.event_id > last.event_id,
+                        and_(Order.event_id == last.event_id, after)
+                    ))
+                )
+            page = page.filter(after)
+        batch = page.limit(batch_size).all()
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+def iter_orders_csv(rows):
+    """Yield CSV text for the given export rows in EXPORT_CHUNK_SIZE chunks."""
+    data = StringIO()
+    w = csv.writer(data)
+
+    # Write Header
+    w.writerow(CSV_HEADER)
+    yield data.getvalue()
+    data.seek(0)
+    data.truncate(0)
+
+    for row in rows:
+        w.writerow((
+            row.id,
+            row.created_at.strftime('%Y-%m-%d %H:%M'),
+            row.customer_name,
+            row.customer_telephone,
+            row.event_title,
+            row.meal_name,
+            row.amount,
+            row.admin_fee,
+            row.amount + row.admin_fee,
+            row.status.value,
+            row.payment_method or 'N/A',
+            row.payment_screenshot or ''
+        ))
+        if data.tell() >= EXPORT_CHUNK_SIZE:
+            yield data.getvalue()
+            data.seek(0)
+            data.truncate(0)
+
+    if data.tell():
+        yield data.getvalue()
+
+def write_orders_workbook(out, rows):
+    """Write a multi-sheet workbook (one sheet per event) to a file object.
+
+    Rows must be grouped by event, as export_rows_query(by_event=True)
+    orders them. Events without orders still get an empty sheet.
+    """
+    # Write-only workbook streams rows to temp files instead of keeping
+    # every cell in memory. Each sheet holds its temp file open until it is
+    # closed, so sheets are filled one at a time and closed straight after.
+    wb = Workbook(write_only=True)
+    events = iter(db.session.query(Event.id, Event.title).order_by(Event.date.desc(), Event.id).all())
+
+    ws = None
+    current = None
+
+    def start_sheet(event):
+        nonlocal ws, current
+        if ws is not None:
+            ws.close()
+        # Sanitize title length (limit 30 chars for Excel sheet names)
+        sheet_title = "".join(c for c in event.title if c.isalnum() or c in (' ', '_', '-'))[:30]
+        ws = wb.create_sheet(title=sheet_title)
+        ws.append(XLSX_HEADER)
+        current = event.id
+
+    for row in rows:
+        while current != row.event_id:
+            event = next(events, None)
+            if event is None:
+                raise ValueError('Export rows are not grouped by event in export order')
+            start_sheet(event)
+        ws.append([
+            row.id,
+            row.created_at.strftime('%Y-%m-%d %H:%M'),
+            row.customer_name,
+            row.customer_telephone,
+            row.meal_name,
+            row.amount,
+            row.admin_fee,
+            row.amount + row.admin_fee,
+            row.status.value,
+            row.payment_method or 'N/A',
+            row.payment_screenshot or ''
+        ])
+
+    # Empty sheets for the events after the last one with orders
+    for event in events:
+        start_sheet(event)
+    if ws is not None:
+        ws.close()
+    wb.save(out)
+
+def get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config['EXPORT_WORKERS'],
+                thread_name_prefix='export'
+            )
+    return _executor
+
+def submit_export_job(app, job_id):
+    """Queue an ExportJob on the local worker pool; returns the Future."""
+    return get_executor(app).submit(run_export_job, app, job_id)
+
+def run_export_job(app, job_id):
+    with app.app_context():
+        job = db.session.get(ExportJob, job_id)
+        folder = app.config['EXPORT_FOLDER']
+        os.makedirs(folder, exist_ok=True)
+        job.filename = f'export_{job.id}_{datetime.now().strftime("%Y%m%d%H%M%S")}.{job.file_format}'
+        job.status = ExportStatus.RUNNING
+        job.total_rows = export_rows_query(job.event_id).order_by(None).count()
+        db.session.commit()
+
+        def tracked_rows():
+            written = 0
+            for batch in iter_export_batches(job.event_id, by_event=job.file_format == 'xlsx'):
+                yield from batch
+                written += len(batch)
+                job.rows_written = written
+                db.session.commit()
+
+        path = os.path.join(folder, job.filename)
+        partial = path + '.part'
+        try:
+            if job.file_format == 'xlsx':
+                with open(partial, 'wb') as out:
+                    write_orders_workbook(out, tracked_rows())
+            else:
+                with open(partial, 'w', newline='', encoding='utf-8') as out:
+                    for chunk in iter_orders_csv(tracked_rows()):
+                        out.write(chunk)
+            os.replace(partial, path)
+        except Exception as e:
+            db.session.rollback()
+            if os.path.exists(partial):
+                os.remove(partial)
+            job.status = ExportStatus.FAILED
+            job.error = str(e)
+        else:
+            job.status = ExportStatus.DONE
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
@@ -0,0 +1,137 @@
+from flask import current_app
+from requests.adapters import HTTPAdapter
+import random
+import requests
+import stripe
+import threading
+import time
+import uuid
+
+class GatewayUnavailable(Exception):
+    """Stripe could not be reached in time, or calls are being shed; nothing was created."""
+
+class CircuitBreaker:
+    """Fail fast once ``failure_threshold`` calls in a row have failed.
+
+    After ``reset_timeout`` seconds one trial call is let through (half-open);
+    its success closes the breaker, its failure opens it for another period.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Restart the clock so only this caller gets the trial
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+def is_transient(error):
+    """Errors worth retrying: network trouble, throttling and Stripe 5xx"""
+    if isinstance(error, (stripe.APIConnectionError, stripe.RateLimitError)):
+        return True
+    return isinstance(error, stripe.APIError) and (error.http_status or 500) >= 500
+
+class StripeGateway:
+    """Process-wide Stripe client: pooled connections, timeouts, retries and a breaker.
+
+    At most ``max_concurrent`` calls are in flight per process; callers wait
+    up to ``queue_timeout`` seconds for a slot and are then turned away, so a
+    slow Stripe ties up a few workers rather than all of them.
+    """
+
+    def __init__(self, api_key, api_base=None, timeout=(3.05, 10), max_retries=2, retry_backoff=0.25,
+                 breaker=None, max_concurrent=4, queue_timeout=1.0):
+        http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrent)
+        http.mount('https://', adapter)
+        http.mount('http://', adapter)
+        self.client = stripe.StripeClient(
+            api_key,
+            base_addresses={'api': api_base} if api_base else None,
+            http_client=stripe.RequestsClient(timeout=timeout, session=http),
+            max_network_retries=0,  # retried below, with jitter and the breaker
+        )
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+    def create_checkout_session(self, params):
+        """Create a Checkout Session, or raise GatewayUnavailable.
+
+        Every attempt reuses one idempotency key, so a retry after a timeout
+        returns the session Stripe may already have created.
+        """
+        if not self.breaker.allow():
+            raise GatewayUnavailable('Stripe circuit breaker is open')
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise GatewayUnavailable('Too many Stripe calls in flight')
+        try:
+            options = {'idempotency_key': f'checkout-{uuid.uuid4()}'}
+            for attempt in range(self.max_retries + 1):
+                try:
+                    session = self.client.v1.checkout.sessions.create(params=params, options=options)
+                except stripe.StripeError as e:
+                    if not is_transient(e):
+                        # Stripe answered; the request itself was wrong
+                        self.breaker.record_success()
+                        raise
+                    if attempt == self.max_retries:
+                        self.breaker.record_failure()
+                        raise GatewayUnavailable(str(e)) from e
+                    # Exponential backoff with full jitter
+                    time.sleep(random.uniform(0, self.retry_backoff * 2 ** attempt))
+                else:
+                    self.breaker.record_success()
+                    return session
+        finally:
+            self._slots.release()
+
+def get_gateway():
+    """The app's StripeGateway, created on first use."""
+    gateway = current_app.extensions.get('payment_gateway')
+    if gateway is None:
+        config = current_app.config
+        if not config['STRIPE_SECRET_KEY']:
+            raise GatewayUnavailable('STRIPE_SECRET_KEY is not set')
+        gateway = current_app.extensions.setdefault('payment_gateway', StripeGateway(
+            config['STRIPE_SECRET_KEY'],
+            api_base=config['STRIPE_API_BASE'],
+            timeout=(config['STRIPE_CONNECT_TIMEOUT'], config['STRIPE_READ_TIMEOUT']),
+            max_retries=config['STRIPE_MAX_RETRIES'],
+            retry_backoff=config['STRIPE_RETRY_BACKOFF'],
+            breaker=CircuitBreaker(config['STRIPE_BREAKER_THRESHOLD'], config['STRIPE_BREAKER_RESET']),
+            max_concurrent=config['STRIPE_MAX_CONCURRENT'],
+            queue_timeout=config['STRIPE_QUEUE_TIMEOUT'],
+        ))
+    return gateway
@@ -0,0 +1,54 @@
+from flask import current_app
+from flask_login import UserMixin
+from app import db
+from app.cache import TTLCache
+from app.models import User
+
+class UserIdentity(UserMixin):
+    """Session-independent snapshot of the columns a request needs about its user.
+
+    Used as ``current_user``; code that changes the user must load the
+    ``User`` row itself and call ``invalidate_identity`` afterwards.
+    """
+
+    def __init__(self, id, name, telephone, is_admin):
+        self.id = id
+        self.name = name
+        self.telephone = telephone
+        self.is_admin = bool(is_admin)
+
+    def __repr__(self):
+        return f'<UserIdentity {self.telephone}>'
+
+def identity_cache():
+    """Per-process cache of user identities, created on first use.
+
+    Profile edits and logins invalidate an entry explicitly; changes made
+    by another worker process (or a script such as create_admin.py) are
+    picked up once USER_CACHE_TTL expires.
+    """
+    cache = current_app.extensions.get('identity_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('identity_cache', TTLCache(
+            maxsize=current_app.config['USER_CACHE_SIZE'],
+            ttl=current_app.config['USER_CACHE_TTL']
+        ))
+    return cache
+
+def snapshot_user(user):
+    return UserIdentity(user.id, user.name, user.telephone, user.is_admin)
+
+def load_identity(user_id):
+    """Identity for a logged-in user id, or None if the user no longer exists."""
+    cache = identity_cache()
+    identity = cache.get(user_id)
+    if identity is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        identity = snapshot_user(user)
+        cache.set(user_id, identity)
+    return identity
+
+def invalidate_identity(user_id):
+    identity_cache().pop(user_id)
@@ -0,0 +1,186 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Request latency histogram bounds, seconds (Prometheus' defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Requests that matched no route (404s, static files served elsewhere)
+UNMATCHED = '<unmatched>'
+
+class EndpointStats:
+    """Running totals for one endpoint."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last one is +Inf
+        self.requests = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    def observe(self, seconds, status, queries, query_seconds):
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.requests += 1
+        if status >= 500:
+            self.errors += 1
+        self.latency_sum += seconds
+        self.latency_max = max(self.latency_max, seconds)
+        self.queries += queries
+        self.query_seconds += query_seconds
+
+    def copy(self):
+        copy = EndpointStats()
+        copy.__dict__.update(self.__dict__, buckets=list(self.buckets))
+        return copy
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None if unbounded)."""
+        rank = q * self.requests
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+class RequestMetrics:
+    """Per-process latency, query and slow-query figures, keyed by endpoint."""
+
+    def __init__(self, slow_query_seconds, slow_query_log_size):
+        self.slow_query_seconds = slow_query_seconds
+        self.endpoints = {}
+        self.slow_queries = deque(maxlen=slow_query_log_size)
+        self.slow_query_count = 0
+        self.started_at = datetime.utcnow()
+        self._lock = threading.Lock()
+
+    def observe_request(self, endpoint, seconds, status, queries, query_seconds):
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.observe(seconds, status, queries, query_seconds)
+
+    def observe_slow_query(self, endpoint, statement, seconds):
+        with self._lock:
+            self.slow_query_count += 1
+            self.slow_queries.appendleft({
+                'at': datetime.utcnow(),
+                'endpoint': endpoint,
+                'seconds': seconds,
+                'statement': statement,
+            })
+
+    def snapshot(self):
+        """Copy of the figures, sorted by total time spent per endpoint."""
+        with self._lock:
+            rows = [(endpoint, stats.copy()) for endpoint, stats in self.endpoints.items()]
+            slow = list(self.slow_queries)
+        rows.sort(key=lambda row: row[1].latency_sum, reverse=True)
+        return rows, slow
+
+def current_endpoint():
+    return (request.endpoint or UNMATCHED) if has_request_context() else None
+
+def start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_query_seconds = 0.0
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+def handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    started = context.connection.info.get('metrics_started') if context.connection else None
+    if started:
+        started.pop()
+
+def init_metrics(app, engines):
+    """Record request and query metrics for this app when METRICS_ENABLED is set.
+
+    Adds before/after-request hooks and cursor hooks on every engine; the
+    figures live in ``app.extensions['metrics']`` for the admin pages.
+    """
+    if not app.config['METRICS_ENABLED']:
+        return None
+    metrics = RequestMetrics(app.config['SLOW_QUERY_MS'] / 1000.0, app.config['SLOW_QUERY_LOG_SIZE'])
+    app.extensions['metrics'] = metrics
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_started')
+        if not started:
+            return
+        seconds = time.perf_counter() - started.pop()
+        endpoint = current_endpoint()
+        # Queries from worker threads have no request to charge them to
+        if endpoint is not None and 'metrics_started' in g:
+            g.metrics_queries += 1
+            g.metrics_query_seconds += seconds
+        if seconds >= metrics.slow_query_seconds:
+            metrics.observe_slow_query(endpoint, statement, seconds)
+            app.logger.warning('Slow query (%.0f ms) in %s: %s', seconds * 1000,
+                               endpoint or 'background', statement)
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(engine, 'handle_error', handle_error)
+
+    app.before_request(start_request)
+
+    @app.after_request
+    def record_request(response):
+        if 'metrics_started' in g:
+            metrics.observe_request(
+                current_endpoint(),
+                time.perf_counter() - g.metrics_started,
+                response.status_code,
+                g.metrics_queries,
+                g.metrics_query_seconds
+            )
+        return response
+
+    return metrics
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_text(metrics):
+    """The metrics in Prometheus' text exposition format (version 0.0.4)."""
+    rows, _ = metrics.snapshot()
+    lines = [
+        '# HELP catering_request_duration_seconds Request latency by endpoint.',
+        '# TYPE catering_request_duration_seconds histogram',
+    ]
+    for endpoint, stats in rows:
+        labels = f'endpoint="{escape_label(endpoint)}",blueprint="{escape_label(endpoint.split(".")[0])}"'
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+            cumulative += count
+            lines.append(f'catering_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'catering_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.requests}')
+        lines.append(f'catering_request_duration_seconds_sum{{{labels}}} {stats.latency_sum:.6f}')
+        lines.append(f'catering_request_duration_seconds_count{{{labels}}} {stats.requests}')
+
+    counters = (
+        ('catering_request_errors_total', 'Responses with a 5xx status.', lambda s: s.errors),
+        ('catering_db_queries_total', 'Database statements executed while serving requests.', lambda s: s.queries),
+        ('catering_db_query_seconds_total', 'Time spent in database statements.', lambda s: f'{s.query_seconds:.6f}'),
+    )
+    for name, help_text, value in counters:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for endpoint, stats in rows:
+            lines.append(f'{name}{{endpoint="{escape_label(endpoint)}"}} {value(stats)}')
+
+    lines.append('# HELP catering_db_slow_queries_total Statements slower than SLOW_QUERY_MS.')
+    lines.append('# TYPE catering_db_slow_queries_total counter')
+    lines.append(f'catering_db_slow_queries_total {metrics.slow_query_count}')
+    return '\n'.join(lines) + '\n'
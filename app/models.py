@@ -2,6 +2,8 @@ from app import db
 from datetime import datetime
 from enum import Enum
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
 
 class OrderStatus(Enum):
     PENDING = 'pending'
@@ -15,6 +17,17 @@ class EventStatus(Enum):
     CANCELLED = 'cancelled'
     COMPLETED = 'completed'
 
+class ExportStatus(Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+class ScreenshotStatus(Enum):
+    PENDING = 'pending'
+    READY = 'ready'
+    INVALID = 'invalid'
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100))
@@ -36,12 +49,18 @@ class Event(db.Model):
     admin_fee = db.Column(db.Float, default=1.0)
     meal_required = db.Column(db.Integer, nullable=False, default=1)
     capacity = db.Column(db.Integer)
+    seats_taken = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # see app.capacity
     status = db.Column(db.Enum(EventStatus), default=EventStatus.ACTIVE)
     image_url = db.Column(db.String(300))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     meal_options = db.relationship('MealOption', backref='event', lazy=True, cascade='all, delete-orphan')
     orders = db.relationship('Order', backref='event', lazy='dynamic')
 
+    @property
+    def is_full(self):
+        return self.capacity is not None and self.seats_taken >= self.capacity
+
     def __repr__(self):
         return f'<Event {self.title}>'
 
@@ -50,6 +69,7 @@ class MealOption(db.Model):
     event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)  # menu description
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
         return f'<MealOption {self.name}>'
@@ -57,11 +77,30 @@ class MealOption(db.Model):
 class SiteSetting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     transfer_phone = db.Column(db.String(30), nullable=False, default='')
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # see app.settings
 
     def __repr__(self):
         return '<SiteSetting>'
 
 class Order(db.Model):
+    __table_args__ = (
+        # My Orders: filter by user, newest first
+        db.Index('ix_order_user_id_created_at', 'user_id', 'created_at'),
+        # Duplicate booking check: (user, event, status)
+        db.Index('ix_order_user_id_event_id_status', 'user_id', 'event_id', 'status'),
+        # One active booking per user and event; checkout relies on this to
+        # collapse double-clicks and retries instead of reading first
+        db.Index('uq_order_active_booking', 'user_id', 'event_id', unique=True,
+                 sqlite_where=db.text("status IN ('PENDING', 'PROCESSING', 'PAID')"),
+                 postgresql_where=db.text("status IN ('PENDING', 'PROCESSING', 'PAID')")),
+        # Touch n Go queue: (status, payment method), newest first
+        db.Index('ix_order_status_payment_method_created_at', 'status', 'payment_method', 'created_at'),
+        # Per-event report, export and stats refresh
+        db.Index('ix_order_event_id_created_at', 'event_id', 'created_at'),
+        # Admin report across all events, keyset paginated on (created_at, id)
+        db.Index('ix_order_created_at', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
@@ -70,11 +109,70 @@ class Order(db.Model):
     admin_fee = db.Column(db.Float, default=0.0)
     payment_method = db.Column(db.String(20), nullable=True)
     payment_screenshot = db.Column(db.String(255), nullable=True)
+    screenshot_status = db.Column(db.Enum(ScreenshotStatus))  # None for orders without an upload
     status = db.Column(db.Enum(OrderStatus), default=OrderStatus.PENDING)
     payment_reference = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    checkout_started_at = db.Column(db.DateTime)  # latest Stripe Checkout Session, None for other methods
 
     meal_option = db.relationship('MealOption')
 
     def __repr__(self):
         return f'<Order {self.id}>'
+
+class ExportJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'))  # None exports every event
+    file_format = db.Column(db.String(10), nullable=False)  # 'csv' or 'xlsx'
+    status = db.Column(db.Enum(ExportStatus), default=ExportStatus.QUEUED)
+    rows_written = db.Column(db.Integer, default=0)
+    total_rows = db.Column(db.Integer)
+    filename = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    @property
+    def download_name(self):
+        if self.event_id:
+            return f'orders_report_event_{self.event_id}.{self.file_format}'
+        return f'orders_report_all_events.{self.file_format}'
+
+    def __repr__(self):
+        return f'<ExportJob {self.id}>'
+
+class StripeEvent(db.Model):
+    """Stripe webhook events already applied; the primary key makes redelivery a no-op."""
+    id = db.Column(db.String(255), primary_key=True)  # Stripe event id (evt_...)
+    type = db.Column(db.String(100), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'))
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StripeEvent {self.id}>'
+
+class EventOrderStat(db.Model):
+    """Materialized order tally per (event, meal option, status), maintained by app.stats."""
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'meal_option_id', 'status', name='uq_event_order_stat'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False, index=True)
+    meal_option_id = db.Column(db.Integer, db.ForeignKey('meal_option.id'))
+    status = db.Column(db.Enum(OrderStatus), nullable=False)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    amount_total = db.Column(db.Float, nullable=False, default=0.0)
+    admin_fee_total = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<EventOrderStat {self.event_id} {self.status}>'
+
+@event.listens_for(Event, 'before_update')
+@event.listens_for(MealOption, 'before_update')
+def touch_updated_at(mapper, connection, target):
+    # ORM edits only: core UPDATEs such as the seats_taken counter don't
+    # bump updated_at, so event page ETags stay stable while orders come in.
+    if object_session(target).is_modified(target, include_collections=False):
+        target.updated_at = datetime.utcnow()
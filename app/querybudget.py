@@ -0,0 +1,104 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from app import db
+from app.database import RoutingSession
+
+class NPlusOneError(Exception):
+    """A relationship was lazily loaded once per row; eager-load it instead."""
+
+class QueryBudgetExceeded(AssertionError):
+    """A block ran more statements or lazy loads than its budget allows."""
+
+# Recorders of the query_budget blocks currently open, in any thread
+_recorders = []
+_recorders_lock = threading.Lock()
+
+def relationship_name(orm_execute_state):
+    prop = orm_execute_state.loader_strategy_path[-1]
+    return f'{prop.parent.class_.__name__}.{prop.key}'
+
+def init_lazy_load_guard(app):
+    """Watch lazy loads per request when LAZY_LOAD_GUARD is 'warn' or 'raise'.
+
+    Unset, the guard warns in debug mode and stays off otherwise.
+    """
+    mode = app.config['LAZY_LOAD_GUARD'] or ('warn' if app.debug else 'off')
+    if mode not in ('warn', 'raise'):
+        return
+    app.extensions['lazy_load_guard'] = {'mode': mode, 'threshold': app.config['LAZY_LOAD_THRESHOLD']}
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def count_lazy_load(orm_execute_state):
+    # Eager loaders are relationship loads too, but have no parent instance
+    if not orm_execute_state.is_relationship_load or orm_execute_state.lazy_loaded_from is None:
+        return
+    name = relationship_name(orm_execute_state)
+    with _recorders_lock:
+        for recorder in _recorders:
+            recorder.lazy_loads[name] += 1
+
+    if not has_request_context():
+        return
+    guard = current_app.extensions.get('lazy_load_guard')
+    if guard is None:
+        return
+    counts = g.setdefault('lazy_loads', Counter())
+    counts[name] += 1
+    if counts[name] == guard['threshold'] + 1:
+        message = (f'{name} was lazily loaded more than {guard["threshold"]} times in '
+                   f'{request.endpoint}; add joinedload/selectinload(...) to the query')
+        if guard['mode'] == 'raise':
+            raise NPlusOneError(message)
+        current_app.logger.warning('Possible N+1: %s', message)
+
+class QueryRecorder:
+    """Statements and lazy loads seen while a query_budget block is open."""
+
+    def __init__(self):
+        self.statements = []
+        self.lazy_loads = Counter()
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+@contextmanager
+def query_budget(app, max_queries=None, max_lazy_loads=None):
+    """Fail if the block runs more than max_queries statements or lazily loads
+    any one relationship more than max_lazy_loads times.
+
+        with query_budget(app, max_queries=4, max_lazy_loads=1):
+            client.get('/orders/')
+
+    Yields the QueryRecorder so callers can inspect what ran.
+    """
+    recorder = QueryRecorder()
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', recorder.before_cursor_execute)
+    with _recorders_lock:
+        _recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        with _recorders_lock:
+            _recorders.remove(recorder)
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', recorder.before_cursor_execute)
+
+    problems = []
+    if max_queries is not None and recorder.count > max_queries:
+        problems.append(f'{recorder.count} queries (budget {max_queries}):\n  ' +
+                        '\n  '.join(' '.join(statement.split()) for statement in recorder.statements))
+    if max_lazy_loads is not None:
+        problems.extend(f'{name} lazily loaded {count} times (budget {max_lazy_loads})'
+                        for name, count in recorder.lazy_loads.items() if count > max_lazy_loads)
+    if problems:
+        raise QueryBudgetExceeded('\n'.join(problems))
@@ -1,13 +1,24 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
-from app.models import User, Event, EventStatus, MealOption, Order, OrderStatus, SiteSetting
-import csv
-from io import StringIO, BytesIO
-from flask import Response, stream_with_context, send_file
-from openpyxl import Workbook
-from datetime import datetime
+from app.models import User, Event, EventStatus, MealOption, Order, OrderStatus, ExportJob, ExportStatus, ScreenshotStatus
+from app.stats import event_summaries, refresh_event_stats
+from app.catalog import invalidate_catalog
+from app.identity import invalidate_identity
+from app.database import read_replica
+from app.settings import get_site_settings, update_site_settings
+from app.exports import EXPORT_BATCH_SIZE, export_rows_query, iter_orders_csv, write_orders_workbook, submit_export_job
+from app.screenshots import thumbnail_name
+from app.metrics import prometheus_text
+import hmac
+import os
+import tempfile
+from flask import Response, stream_with_context, send_file, send_from_directory, jsonify
+from datetime import datetime, timedelta
 from functools import wraps
+from werkzeug.security import safe_join
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import joinedload, selectinload
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -32,6 +43,7 @@ def login():
         
         user = User.query.filter_by(telephone=telephone).first()
         if user and user.is_admin:
+            invalidate_identity(user.id)  # a cached snapshot may predate the promotion
             login_user(user)
             return redirect(url_for('admin.dashboard'))
         else:
@@ -48,25 +60,23 @@ def logout():
 @bp.route('/dashboard')
 @admin_required
 def dashboard():
-    events = Event.query.order_by(Event.date.desc()).all()
-    settings = SiteSetting.query.first()
-    if not settings:
-        settings = SiteSetting(transfer_phone='')
-        db.session.add(settings)
-        db.session.commit()
-    return render_template('admin/dashboard.html', events=events, settings=settings)
+    events = Event.query.options(selectinload(Event.meal_options)).order_by(Event.date.desc()).all()
+    settings = get_site_settings()
+    # Order counts and revenue come from the materialized stats table
+    summaries = event_summaries()
+    return render_template(
+        'admin/dashboard.html',
+        events=events,
+        settings=settings,
+        summaries=summaries,
+        statuses=OrderStatus
+    )
 
 @bp.route('/settings/transfer-phone', methods=['POST'])
 @admin_required
 def update_transfer_phone():
     transfer_phone = (request.form.get('transfer_phone') or '').strip()
-    settings = SiteSetting.query.first()
-    if not settings:
-        settings = SiteSetting(transfer_phone=transfer_phone)
-        db.session.add(settings)
-    else:
-        settings.transfer_phone = transfer_phone
-    db.session.commit()
+    update_site_settings(transfer_phone=transfer_phone)
     flash('Transfer phone updated.', 'success')
     return redirect(url_for('admin.dashboard'))
 
@@ -109,6 +119,7 @@ def new_event():
                 db.session.add(meal)
 
             db.session.commit()
+            invalidate_catalog(event.id)
             flash('Event created successfully!')
             return redirect(url_for('admin.dashboard'))
         except ValueError:
@@ -147,6 +158,7 @@ def edit_event(event_id):
                 else:
                     db.session.add(MealOption(event_id=event.id, name=name, description=desc or None))
             db.session.commit()
+            invalidate_catalog(event.id)
             flash('Event updated successfully!')
             return redirect(url_for('admin.dashboard'))
         except ValueError:
@@ -160,22 +172,101 @@ def cancel_event(event_id):
     event = Event.query.get_or_404(event_id)
     event.status = EventStatus.CANCELLED
     db.session.commit()
+    invalidate_catalog(event.id)
     flash(f'Event "{event.title}" has been cancelled.')
     return redirect(url_for('admin.dashboard'))
 
+def encode_order_cursor(order):
+    """Keyset cursor for the (created_at, id) position of an order."""
+    return f"{order.created_at.strftime('%Y%m%d%H%M%S%f')}-{order.id}"
+
+def decode_order_cursor(cursor):
+    """Return (created_at, id) from a cursor, or None if it is malformed."""
+    try:
+        stamp, order_id = cursor.split('-', 1)
+        return datetime.strptime(stamp, '%Y%m%d%H%M%S%f'), int(order_id)
+    except (AttributeError, ValueError):
+        return None
+
+def parse_filter_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        flash(f'Invalid date "{value}", expected YYYY-MM-DD.', 'error')
+        return None
+
 @bp.route('/orders')
 @admin_required
+@read_replica
 def list_orders():
     event_id = request.args.get('event_id')
-    
-    query = Order.query
+    status = request.args.get('status')
+    payment_method = request.args.get('payment_method')
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+    cursor = request.args.get('cursor')
+    per_page = current_app.config['ADMIN_ORDERS_PER_PAGE']
+
+    # Load user, event and meal option in the same SELECT so the report
+    # template doesn't fire three lazy loads per row.
+    query = Order.query.options(
+        joinedload(Order.user),
+        joinedload(Order.event),
+        joinedload(Order.meal_option)
+    )
     if event_id and event_id != 'all':
         query = query.filter_by(event_id=event_id)
-    
-    orders = query.order_by(Order.created_at.desc()).all()
+    if status:
+        try:
+            query = query.filter_by(status=OrderStatus(status))
+        except ValueError:
+            flash(f'Unknown status "{status}".', 'error')
+    if payment_method:
+        query = query.filter_by(payment_method=payment_method)
+    start = parse_filter_date(date_from)
+    if start:
+        query = query.filter(Order.created_at >= start)
+    end = parse_filter_date(date_to)
+    if end:
+        query = query.filter(Order.created_at < end + timedelta(days=1))
+
+    # Keyset pagination: continue strictly after the last (created_at, id)
+    # of the previous page instead of using OFFSET.
+    position = decode_order_cursor(cursor) if cursor else None
+    if position:
+        created_at, last_id = position
+        query = query.filter(or_(
+            Order.created_at < created_at,
+            and_(Order.created_at == created_at, Order.id < last_id)
+        ))
+
+    orders = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(per_page + 1).all()
+    next_cursor = None
+    if len(orders) > per_page:
+        orders = orders[:per_page]
+        next_cursor = encode_order_cursor(orders[-1])
+
     events = Event.query.order_by(Event.date.desc()).all()
+    filters = {
+        key: value for key, value in (
+            ('event_id', event_id),
+            ('status', status),
+            ('payment_method', payment_method),
+            ('date_from', date_from),
+            ('date_to', date_to),
+        ) if value
+    }
     
-    return render_template('admin/orders.html', orders=orders, events=events, current_filter=event_id)
+    return render_template(
+        'admin/orders.html',
+        orders=orders,
+        events=events,
+        current_filter=event_id,
+        filters=filters,
+        statuses=list(OrderStatus),
+        next_cursor=next_cursor,
+        is_first_page=not position
+    )
 
 
 @bp.route('/orders/<int:order_id>/status', methods=['POST'])
@@ -199,45 +290,17 @@ def update_order_status(order_id):
 
 @bp.route('/orders/export')
 @admin_required
+@read_replica
 def export_orders():
     event_id = request.args.get('event_id')
     
     # 1. Excel Export for "All Events"
     if not event_id or event_id == 'all':
-        wb = Workbook()
-        # Remove default sheet
-        default_ws = wb.active
-        wb.remove(default_ws)
-        
-        events = Event.query.order_by(Event.date.desc()).all()
-        
-        for event in events:
-            # Create a sheet for each event, sanitize title length (limit 30 chars for Excel sheet names)
-            sheet_title = "".join(c for c in event.title if c.isalnum() or c in (' ', '_', '-'))[:30]
-            ws = wb.create_sheet(title=sheet_title)
-            
-            # Header
-            ws.append(['Order ID', 'Date', 'Customer Name', 'Customer Tel', 'Meal', 'Amount', 'Admin Fee', 'Total', 'Status', 'Payment Method', 'Screenshot'])
-            
-            # Data
-            orders = Order.query.filter_by(event_id=event.id).order_by(Order.created_at.desc()).all()
-            for order in orders:
-                ws.append([
-                    order.id,
-                    order.created_at.strftime('%Y-%m-%d %H:%M'),
-                    order.user.name,
-                    order.user.telephone,
-                    order.meal_option.name,
-                    order.amount,
-                    order.admin_fee,
-                    order.amount + order.admin_fee,
-                    order.status.value,
-                    order.payment_method or 'N/A',
-                    order.payment_screenshot or ''
-                ])
-        
-        out = BytesIO()
-        wb.save(out)
+        # One joined query for every event, fetched in batches and spooled
+        # to a temporary file rather than a BytesIO buffer
+        rows = export_rows_query(by_event=True).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        out = tempfile.TemporaryFile()
+        write_orders_workbook(out, rows)
         out.seek(0)
         
         return send_file(
@@ -249,51 +312,144 @@ def export_orders():
 
     # 2. CSV Export for Single Event
     else:
-        def generate():
-            data = StringIO()
-            w = csv.writer(data)
-            
-            # Write Header
-            w.writerow(('Order ID', 'Date', 'Customer', 'Telephone', 'Event', 'Meal Option', 'Amount', 'Admin Fee', 'Total', 'Status', 'Payment Method', 'Screenshot'))
-            yield data.getvalue()
-            data.seek(0)
-            data.truncate(0)
-            
-            orders = Order.query.filter_by(event_id=event_id).order_by(Order.created_at.desc()).all()
-            for order in orders:
-                w.writerow((
-                    order.id,
-                    order.created_at.strftime('%Y-%m-%d %H:%M'),
-                    order.user.name,
-                    order.user.telephone,
-                    order.event.title,
-                    order.meal_option.name,
-                    order.amount,
-                    order.admin_fee,
-                    order.amount + order.admin_fee,
-                    order.status.value,
-                    order.payment_method or 'N/A',
-                    order.payment_screenshot or ''
-                ))
-                yield data.getvalue()
-                data.seek(0)
-                data.truncate(0)
-
-        response = Response(stream_with_context(generate()), mimetype='text/csv')
+        # Rows arrive from the DB in batches with the joins already done;
+        # output is flushed in larger chunks rather than once per row.
+        rows = export_rows_query(event_id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        response = Response(stream_with_context(iter_orders_csv(rows)), mimetype='text/csv')
         response.headers.set('Content-Disposition', 'attachment', filename=f'orders_report_event_{event_id}.csv')
         return response
 
+@bp.route('/exports', methods=['POST'])
+@admin_required
+def start_export():
+    """Queue an order report export on the background worker pool"""
+    event_id = request.form.get('event_id')
+    if event_id and event_id != 'all':
+        event = Event.query.get_or_404(event_id)
+        job = ExportJob(user_id=current_user.id, event_id=event.id, file_format='csv')
+    else:
+        job = ExportJob(user_id=current_user.id, file_format='xlsx')
+    db.session.add(job)
+    db.session.commit()
+    submit_export_job(current_app._get_current_object(), job.id)
+    return redirect(url_for('admin.export_status', job_id=job.id))
+
+@bp.route('/exports/<int:job_id>')
+@admin_required
+def export_status(job_id):
+    job = ExportJob.query.get_or_404(job_id)
+    return render_template('admin/export_status.html', job=job)
+
+@bp.route('/exports/<int:job_id>/progress')
+@admin_required
+def export_progress(job_id):
+    job = ExportJob.query.get_or_404(job_id)
+    return jsonify(
+        status=job.status.value,
+        rows_written=job.rows_written or 0,
+        total_rows=job.total_rows,
+        error=job.error,
+        download_url=url_for('admin.download_export', job_id=job.id) if job.status == ExportStatus.DONE else None
+    )
+
+@bp.route('/exports/<int:job_id>/download')
+@admin_required
+def download_export(job_id):
+    job = ExportJob.query.get_or_404(job_id)
+    if job.status != ExportStatus.DONE:
+        abort(404)
+    path = os.path.join(current_app.config['EXPORT_FOLDER'], job.filename)
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(path, as_attachment=True, download_name=job.download_name)
+
+@bp.route('/screenshots/<filename>')
+@admin_required
+def screenshot(filename):
+    """Serve a payment screenshot, or its thumbnail with ?size=thumb.
+
+    Uploads are never rewritten (processed ones are named after a hash of
+    their content), so the browser may keep them for a year without
+    revalidating. Screenshots from before the pipeline have no thumbnail
+    and fall back to the full image.
+    """
+    folder = current_app.config['UPLOAD_FOLDER']
+    if request.args.get('size') == 'thumb':
+        thumb = safe_join(folder, thumbnail_name(filename))
+        if thumb and os.path.exists(thumb):
+            filename = thumbnail_name(filename)
+    response = send_from_directory(folder, filename, max_age=current_app.config['SCREENSHOT_CACHE_MAX_AGE'])
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
+
 @bp.route('/touchngo/verify')
 @admin_required
 def touchngo_verifications():
     """List all pending Touch n Go payments for verification"""
-    orders = Order.query.filter_by(
+    orders = Order.query.options(
+        joinedload(Order.user), joinedload(Order.event), joinedload(Order.meal_option)
+    ).filter_by(
         status=OrderStatus.PROCESSING,
         payment_method='touchngo'
     ).order_by(Order.created_at.desc()).all()
     
     return render_template('admin/touchngo_verify.html', orders=orders)
 
+@bp.route('/touchngo/verify/bulk', methods=['POST'])
+@admin_required
+def bulk_verify_touchngo():
+    """Approve or reject many Touch n Go payments in one transaction.
+
+    One UPDATE ... RETURNING changes every selected order that is still
+    awaiting verification and whose receipt the admin could see: approval
+    needs a processed (READY) screenshot, rejection a READY or INVALID one.
+    The rest (already handled, not Touch n Go, or receipt still being
+    processed) are reported as skipped. Returns per-order results as JSON
+    when asked, otherwise flashes a summary and goes back to the queue.
+    """
+    action = request.form.get('action')
+    order_ids = sorted({int(i) for i in request.form.getlist('order_ids') if i.isdigit()})
+    if action not in ('approve', 'reject') or not order_ids:
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': 'Choose approve or reject and at least one order.'}), 400
+        flash('Select at least one order to approve or reject.', 'error')
+        return redirect(url_for('admin.touchngo_verifications'))
+
+    values = {'status': OrderStatus.FAILED}
+    reviewable = (ScreenshotStatus.READY, ScreenshotStatus.INVALID)
+    if action == 'approve':
+        values = {'status': OrderStatus.PAID,
+                  'payment_reference': f"TNG-{datetime.now().strftime('%Y%m%d%H%M%S')}"}
+        reviewable = (ScreenshotStatus.READY,)
+    changed = db.session.execute(
+        update(Order)
+        .where(Order.id.in_(order_ids),
+               Order.status == OrderStatus.PROCESSING,
+               Order.payment_method == 'touchngo',
+               Order.screenshot_status.in_(reviewable))
+        .values(**values)
+        .returning(Order.id, Order.event_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    # Bulk UPDATEs bypass the after_flush hook, so refresh stats here
+    refresh_event_stats(db.session.connection(), {event_id for _, event_id in changed})
+    db.session.commit()
+
+    done = 'approved' if action == 'approve' else 'rejected'
+    changed_ids = {order_id for order_id, _ in changed}
+    results = {order_id: done if order_id in changed_ids else 'skipped' for order_id in order_ids}
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'action': action, 'updated': len(changed_ids), 'results': results})
+
+    flash(f'{len(changed_ids)} order(s) {done}.', 'success' if action == 'approve' else 'warning')
+    skipped = [f'#{order_id}' for order_id, result in results.items() if result == 'skipped']
+    if skipped:
+        flash(f'Skipped {", ".join(skipped)}: no longer awaiting verification, '
+              f'or no readable receipt to {action}.', 'error')
+    return redirect(url_for('admin.touchngo_verifications'))
+
 @bp.route('/touchngo/verify/<int:order_id>', methods=['POST'])
 @admin_required
 def verify_touchngo(order_id):
@@ -318,3 +474,24 @@ def verify_touchngo(order_id):
     
     db.session.commit()
     return redirect(url_for('admin.touchngo_verifications'))
+
+@bp.route('/metrics')
+@admin_required
+def metrics():
+    """Per-endpoint latency and query figures for this worker process"""
+    recorded = current_app.extensions.get('metrics')
+    rows, slow_queries = recorded.snapshot() if recorded else ([], [])
+    return render_template('admin/metrics.html', metrics=recorded, rows=rows, slow_queries=slow_queries)
+
+@bp.route('/metrics/prometheus')
+def prometheus_metrics():
+    """The same figures for a Prometheus scraper (admin session or METRICS_TOKEN)"""
+    token = current_app.config['METRICS_TOKEN']
+    supplied = request.headers.get('Authorization', '')
+    if not (current_user.is_authenticated and current_user.is_admin) and \
+            not (token and hmac.compare_digest(supplied, f'Bearer {token}')):
+        abort(403)
+    recorded = current_app.extensions.get('metrics')
+    if recorded is None:
+        abort(404)
+    return Response(prometheus_text(recorded), mimetype='text/plain; version=0.0.4')
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.models import User
+from app.identity import invalidate_identity
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -29,6 +30,7 @@ def login():
             # Existing user
             # Optionally update name if different? User story implies simple login.
             # Let's keep it simple: just login.
+            invalidate_identity(user.id)  # pick up changes made elsewhere
             login_user(user)
         else:
             # Create new user
@@ -52,19 +54,22 @@ def logout():
 @bp.route('/profile', methods=['GET', 'POST'])
 @login_required
 def profile():
+    # current_user is a cached snapshot; edits go through the User row
+    user = db.session.get(User, current_user.id)
     if request.method == 'POST':
         email = request.form.get('email')
         name = request.form.get('name') # Allow name update too
         
         # Validations could go here
         
-        current_user.email = email
-        current_user.name = name
+        user.email = email
+        user.name = name
         try:
             db.session.commit()
             flash('Profile updated.')
         except:
             db.session.rollback()
             flash('Error updating profile. Email might be in use.')
+        invalidate_identity(user.id)
 
-    return render_template('auth/profile.html')
+    return render_template('auth/profile.html', user=user)
@@ -1,28 +1,76 @@
-from flask import Blueprint, render_template, abort
-from app.models import Event, EventStatus, MealOption
+from flask import Blueprint, render_template, abort, request, session, make_response
+from flask_login import current_user
+from hashlib import sha1
+from app.models import EventStatus
+from app.catalog import get_active_events, get_event_detail
+from app.database import read_replica
 
 bp = Blueprint('events', __name__, url_prefix='/events')
 
+def page_etag(*parts):
+    """Weak ETag over the page data and the viewer (the navbar varies per user)."""
+    if current_user.is_authenticated:
+        viewer = f'user-{current_user.id}-{int(bool(current_user.is_admin))}'
+    else:
+        viewer = 'anon'
+    return sha1('|'.join([viewer] + [str(part) for part in parts]).encode()).hexdigest()
+
+def conditional_page(etag, last_modified, render):
+    """Return 304 if the client's copy is current, else the rendered page with validators."""
+    # Pending flash messages are part of the page, so always render them
+    if not session.get('_flashes'):
+        if request.if_none_match:
+            fresh = request.if_none_match.contains_weak(etag)
+        else:
+            fresh = (last_modified is not None and request.if_modified_since is not None
+                     and last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None))
+        if fresh:
+            response = make_response('', 304)
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['Vary'] = 'Cookie'
+            return response
+
+    response = make_response(render())
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Cache, but revalidate every time; the navbar depends on the login cookie
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Cookie'
+    return response
+
 @bp.route('/', methods=['GET'])
+@read_replica
 def list_events():
-    # Show active events, sorted by date
-    events = Event.query.filter_by(status=EventStatus.ACTIVE)\
-        .order_by(Event.date.asc()).all()
-    return render_template('events/list.html', events=events)
+    # Show active events, sorted by date (cached; admin edits invalidate)
+    events = get_active_events()
+    # No Last-Modified here: cancelling an event removes it from the list
+    # without making the remaining ones any newer, so only the ETag is safe.
+    etag = page_etag(*(f'{event.id}:{event.updated_at}' for event in events))
+    return conditional_page(etag, None, lambda: render_template('events/list.html', events=events))
 
 @bp.route('/<int:event_id>', methods=['GET'])
+@read_replica
 def get_event(event_id):
-    event = Event.query.get_or_404(event_id)
+    event = get_event_detail(event_id)
+    if event is None:
+        abort(404)
     if event.status == EventStatus.CANCELLED:
         # Optionally show but mark as cancelled, or generic 404?
         # Requirement says "Cancelled events hidden or labeled".
         pass
-    meal_menu_descriptions = [
-        {"id": m.id, "description": m.description or ""}
-        for m in event.meal_options
-    ]
-    return render_template(
-        'events/detail.html',
-        event=event,
-        meal_menu_descriptions=meal_menu_descriptions,
-    )
+
+    def render():
+        meal_menu_descriptions = [
+            {"id": m.id, "description": m.description or ""}
+            for m in event.meal_options
+        ]
+        return render_template(
+            'events/detail.html',
+            event=event,
+            meal_menu_descriptions=meal_menu_descriptions,
+        )
+
+    etag = page_etag(event.id, event.updated_at)
+    return conditional_page(etag, event.updated_at, render)
@@ -1,14 +1,19 @@
 from flask import Blueprint, render_template, abort
 from flask_login import login_required, current_user
 from app.models import Order, OrderStatus
+from app.database import read_replica
+from sqlalchemy.orm import joinedload
 
 bp = Blueprint('orders', __name__, url_prefix='/orders')
 
 @bp.route('/', methods=['GET'])
 @login_required
+@read_replica
 def list_orders():
     # Fetch orders for current user, sorted by date desc
-    orders = Order.query.filter_by(user_id=current_user.id)\
+    # The list shows each order's event and meal, so load them in the same SELECT
+    orders = Order.query.options(joinedload(Order.event), joinedload(Order.meal_option))\
+        .filter_by(user_id=current_user.id)\
         .order_by(Order.created_at.desc()).all()
     return render_template('orders/list.html', orders=orders)
 
@@ -1,11 +1,19 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, current_app
 from flask_login import login_required, current_user
 from app import db
-from app.models import Event, MealOption, Order, OrderStatus, SiteSetting
+from app.models import Event, MealOption, Order, OrderStatus, ScreenshotStatus
+from app.settings import get_site_settings
+from app.capacity import reserve_seat
+from app.stats import SEAT_STATUSES
+from app.webhooks import apply_stripe_event
+from app.gateway import get_gateway, GatewayUnavailable
+from app.screenshots import stage_upload, claim_upload, submit_screenshot
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
-from werkzeug.utils import secure_filename
 import uuid
+import json
 import os
+import time
 import stripe
 
 bp = Blueprint('payment', __name__, url_prefix='/payment')
@@ -15,6 +23,61 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
+def active_order(event_id):
+    """The current user's pending, processing or paid order for an event"""
+    return Order.query.filter(
+        Order.user_id == current_user.id,
+        Order.event_id == event_id,
+        Order.status.in_(SEAT_STATUSES)
+    ).first()
+
+def existing_booking(order, event_id):
+    """Send the user to the booking that blocked a new order"""
+    if order is None:
+        # The other order finished or failed in the meantime
+        flash('Your booking changed while we were processing it. Please try again.', 'error')
+        return redirect(url_for('events.get_event', event_id=event_id))
+    if order.status == OrderStatus.PAID:
+        flash('You have already booked this event!', 'warning')
+        return redirect(url_for('events.list_events'))
+    if order.payment_method == 'touchngo':
+        flash('Your Touch n Go payment for this event is already awaiting verification.', 'warning')
+        return redirect(url_for('payment.touchngo_confirmation', order_id=order.id))
+    flash('You have an unfinished card payment for this event.', 'warning')
+    return redirect(url_for('payment.stripe_payment', event_id=order.event_id,
+                            meal_id=order.meal_option_id))
+
+def place_touchngo_order(event, meal, amount, admin_fee, staged):
+    """Create a PROCESSING Touch n Go order for a staged screenshot upload"""
+    if not reserve_seat(event.id):
+        db.session.rollback()
+        flash('Sorry, this event is fully booked.', 'error')
+        return redirect(url_for('events.get_event', event_id=event.id))
+
+    order = Order(
+        user_id=current_user.id,
+        event_id=event.id,
+        meal_option_id=meal.id,
+        amount=amount,
+        admin_fee=admin_fee,
+        status=OrderStatus.PROCESSING,
+        payment_method='touchngo',
+        screenshot_status=ScreenshotStatus.PENDING
+    )
+    db.session.add(order)
+    try:
+        db.session.flush()  # Get order ID
+    except IntegrityError:
+        # uq_order_active_booking: the user already has an active order
+        db.session.rollback()
+        return existing_booking(active_order(event.id), event.id)
+
+    claim_upload(current_app, staged, order.id)
+    db.session.commit()
+    submit_screenshot(current_app._get_current_object(), order.id)
+
+    return redirect(url_for('payment.touchngo_confirmation', order_id=order.id))
+
 @bp.route('/checkout', methods=['GET', 'POST'])
 @login_required
 def checkout():
@@ -29,24 +92,17 @@ def checkout():
         event = Event.query.get_or_404(event_id)
         meal = MealOption.query.get_or_404(meal_id)
         
-        # Check for existing PAID order
-        existing_order = Order.query.filter_by(
-            user_id=current_user.id, 
-            event_id=event.id, 
-            status=OrderStatus.PAID
-        ).first()
-        
-        if existing_order:
-            flash('You have already booked this event!', 'warning')
-            return redirect(url_for('events.list_events'))
+        # Duplicate bookings are rejected by the database when the order is placed
+        if event.is_full:
+            flash('Sorry, this event is fully booked.', 'error')
+            return redirect(url_for('events.get_event', event_id=event.id))
         
         # Calculate base amount (admin fee applies only to Stripe)
         meal_count = event.meal_required or 1
         base_amount = event.fee * meal_count
         stripe_fee = round((base_amount * 0.03) + 1.0, 2)
         stripe_total = base_amount + stripe_fee
-        settings = SiteSetting.query.first()
-        transfer_phone = settings.transfer_phone if settings else ''
+        transfer_phone = get_site_settings().transfer_phone
 
         return render_template(
             'payment/checkout.html',
@@ -71,17 +127,6 @@ def checkout():
         if meal.event_id != event.id:
             abort(400)
 
-        # Check existing again
-        existing_order = Order.query.filter_by(
-            user_id=current_user.id, 
-            event_id=event.id, 
-            status=OrderStatus.PAID
-        ).first()
-        
-        if existing_order:
-            flash('You have already booked this event!', 'warning')
-            return redirect(url_for('events.list_events'))
-        
         # Calculate base amount and Stripe fee (if applicable)
         meal_count = event.meal_required or 1
         base_amount = event.fee * meal_count
@@ -105,34 +150,14 @@ def checkout():
                 return redirect(url_for('payment.checkout', event_id=event_id, meal_id=meal_id))
             
             if file and allowed_file(file.filename):
-                # Create order first to get ID
-                order = Order(
-                    user_id=current_user.id,
-                    event_id=event.id,
-                    meal_option_id=meal.id,
-                    amount=base_amount,
-                    admin_fee=admin_fee,
-                    status=OrderStatus.PROCESSING,
-                    payment_method='touchngo'
-                )
-                db.session.add(order)
-                db.session.flush()  # Get order ID
-                
-                # Save file with unique name
-                file_ext = file.filename.rsplit('.', 1)[1].lower()
-                filename = f"{order.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.{file_ext}"
-                
-                # Ensure upload directory exists
-                upload_dir = current_app.config['UPLOAD_FOLDER']
-                os.makedirs(upload_dir, exist_ok=True)
-                
-                filepath = os.path.join(upload_dir, filename)
-                file.save(filepath)
-                
-                order.payment_screenshot = filename
-                db.session.commit()
-                
-                return redirect(url_for('payment.touchngo_confirmation', order_id=order.id))
+                # Raw bytes are on disk before the order's transaction starts;
+                # validation and re-encoding happen in the background
+                staged = stage_upload(current_app, file)
+                try:
+                    return place_touchngo_order(event, meal, base_amount, admin_fee, staged)
+                finally:
+                    if os.path.exists(staged):
+                        os.remove(staged)
             else:
                 flash('Invalid file type. Please upload a PNG, JPG, or JPEG image.', 'error')
                 return redirect(url_for('payment.checkout', event_id=event_id, meal_id=meal_id))
@@ -144,8 +169,6 @@ def checkout():
 @login_required
 def stripe_payment(event_id, meal_id):
     """Create Stripe checkout session"""
-    stripe.api_key = current_app.config['STRIPE_SECRET_KEY']
-    
     event = Event.query.get_or_404(event_id)
     meal = MealOption.query.get_or_404(meal_id)
     
@@ -153,76 +176,114 @@ def stripe_payment(event_id, meal_id):
     if meal.event_id != event.id:
         abort(400)
     
-    # Create pending order
+    # Create pending order (holds the reserved seat until paid or failed)
     meal_count = event.meal_required or 1
     base_amount = event.fee * meal_count
     stripe_fee = round((base_amount * 0.03) + 1.0, 2)
-    order = Order(
-        user_id=current_user.id,
-        event_id=event.id,
-        meal_option_id=meal.id,
-        amount=base_amount,
-        admin_fee=stripe_fee,
-        status=OrderStatus.PENDING,
-        payment_method='stripe',
-        payment_reference=str(uuid.uuid4())
-    )
-    db.session.add(order)
-    db.session.commit()
+    order = None
+    if reserve_seat(event.id):
+        order = Order(
+            user_id=current_user.id,
+            event_id=event.id,
+            meal_option_id=meal.id,
+            amount=base_amount,
+            admin_fee=stripe_fee,
+            status=OrderStatus.PENDING,
+            payment_method='stripe',
+            payment_reference=str(uuid.uuid4()),
+            checkout_started_at=datetime.utcnow()
+        )
+        db.session.add(order)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # uq_order_active_booking: the user already has an active order
+            order = None
+
+    if order is None:
+        # Full, or a retry/double-click: reuse the user's unfinished Stripe
+        # order (and the seat it holds) instead of adding another
+        db.session.rollback()
+        order = active_order(event.id)
+        if order is None and event.capacity is not None:
+            flash('Sorry, this event is fully booked.', 'error')
+            return redirect(url_for('events.get_event', event_id=event.id))
+        if order is None or order.status != OrderStatus.PENDING or order.payment_method != 'stripe':
+            return existing_booking(order, event.id)
+        order.meal_option_id = meal.id
+        order.amount = base_amount
+        order.admin_fee = stripe_fee
+        # A new session supersedes the last one; its expiry or cancel must not fail the order
+        order.payment_reference = str(uuid.uuid4())
+        # ...and restarts the clock the sweeper measures abandonment by
+        order.checkout_started_at = datetime.utcnow()
+        db.session.commit()
     
-    try:
-        # Create Stripe checkout session
-        checkout_session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=[
-                {
-                    'price_data': {
-                        'currency': current_app.config['STRIPE_CURRENCY'],
-                        'unit_amount': int(event.fee * 100),  # Convert to cents
-                        'product_data': {
-                            'name': f'{event.title} - {meal.name}',
-                            'description': f'Event on {event.date.strftime("%B %d, %Y")}',
-                        },
+    # Create Stripe checkout session
+    params = dict(
+        payment_method_types=['card'],
+        line_items=[
+            {
+                'price_data': {
+                    'currency': current_app.config['STRIPE_CURRENCY'],
+                    'unit_amount': int(event.fee * 100),  # Convert to cents
+                    'product_data': {
+                        'name': f'{event.title} - {meal.name}',
+                        'description': f'Event on {event.date.strftime("%B %d, %Y")}',
                     },
-                    'quantity': meal_count,
                 },
-                {
-                    'price_data': {
-                        'currency': current_app.config['STRIPE_CURRENCY'],
-                        'unit_amount': int(round(stripe_fee * 100)),  # Convert to cents
-                        'product_data': {
-                            'name': 'Admin Fee',
-                        },
+                'quantity': meal_count,
+            },
+            {
+                'price_data': {
+                    'currency': current_app.config['STRIPE_CURRENCY'],
+                    'unit_amount': int(round(stripe_fee * 100)),  # Convert to cents
+                    'product_data': {
+                        'name': 'Admin Fee',
                     },
-                    'quantity': 1,
                 },
-            ],
-            mode='payment',
-            success_url=url_for('payment.stripe_success', order_id=order.id, _external=True),
-            cancel_url=url_for('payment.stripe_cancel', order_id=order.id, _external=True),
-        )
-        
-        return redirect(checkout_session.url, code=303)
-    except Exception as e:
-        order.status = OrderStatus.FAILED
-        db.session.commit()
-        flash(f'Payment error: {str(e)}', 'error')
+                'quantity': 1,
+            },
+        ],
+        mode='payment',
+        # Stripe stops accepting payment before the sweeper gives the seat away
+        expires_at=int(time.time()) + current_app.config['STRIPE_SESSION_TTL_MINUTES'] * 60,
+        client_reference_id=str(order.id),
+        # payment_reference names the order's current session until it is paid
+        metadata={'order_id': str(order.id), 'checkout_ref': order.payment_reference},
+        success_url=url_for('payment.stripe_success', order_id=order.id, _external=True),
+        cancel_url=url_for('payment.stripe_cancel', order_id=order.id, ref=order.payment_reference, _external=True),
+    )
+    # End the transaction so no database connection is held during the call
+    order_id = order.id
+    db.session.commit()
+    
+    try:
+        checkout_session = get_gateway().create_checkout_session(params)
+    except (GatewayUnavailable, stripe.StripeError) as e:
+        current_app.logger.warning('Stripe checkout for order #%s failed: %s', order_id, e)
+        # Give the seat back; the customer can retry or pay another way
+        order = db.session.get(Order, order_id)
+        if order.status == OrderStatus.PENDING:
+            order.status = OrderStatus.FAILED
+            db.session.commit()
+        if isinstance(e, GatewayUnavailable):
+            flash('Card payments are temporarily unavailable. Please try again shortly or pay with Touch n Go.', 'error')
+            return redirect(url_for('payment.checkout', event_id=event_id, meal_id=meal_id))
+        flash(f'Payment error: {e.user_message or "the card payment could not be started."}', 'error')
         return redirect(url_for('events.list_events'))
+    
+    return redirect(checkout_session.url, code=303)
 
 @bp.route('/stripe/success/<int:order_id>')
 @login_required
 def stripe_success(order_id):
-    """Handle successful Stripe payment"""
+    """Return page after Stripe Checkout; the webhook confirms the payment"""
     order = Order.query.get_or_404(order_id)
     
     if order.user_id != current_user.id:
         abort(403)
     
-    # Update order status
-    order.status = OrderStatus.PAID
-    order.payment_reference = f"STRIPE-{uuid.uuid4().hex[:10].upper()}"
-    db.session.commit()
-    
     return redirect(url_for('payment.result', order_id=order.id))
 
 @bp.route('/stripe/cancel/<int:order_id>')
@@ -234,11 +295,34 @@ def stripe_cancel(order_id):
     if order.user_id != current_user.id:
         abort(403)
     
-    order.status = OrderStatus.FAILED
-    db.session.commit()
+    # A webhook may already have confirmed the payment, and the Back button
+    # of a superseded session must not fail the one the customer is using
+    if order.status == OrderStatus.PENDING and request.args.get('ref') == order.payment_reference:
+        order.status = OrderStatus.FAILED
+        db.session.commit()
     
     return redirect(url_for('payment.result', order_id=order.id))
 
+@bp.route('/stripe/webhook', methods=['POST'])
+def stripe_webhook():
+    """Receive Stripe events; the only place a card payment is marked PAID"""
+    secret = current_app.config['STRIPE_WEBHOOK_SECRET']
+    if not secret:
+        current_app.logger.error('Stripe webhook received but STRIPE_WEBHOOK_SECRET is not set')
+        return 'Webhook not configured', 503
+    
+    payload = request.get_data()
+    try:
+        stripe.WebhookSignature.verify_header(payload, request.headers.get('Stripe-Signature'), secret,
+                                              stripe.Webhook.DEFAULT_TOLERANCE)
+        event = json.loads(payload)
+    except (stripe.SignatureVerificationError, ValueError):
+        return 'Invalid signature', 400
+    
+    if not apply_stripe_event(event):
+        return 'Already processed', 200
+    return 'OK', 200
+
 @bp.route('/touchngo/confirmation/<int:order_id>')
 @login_required
 def touchngo_confirmation(order_id):
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from PIL import Image, ImageOps, UnidentifiedImageError
+from app import db
+from app.models import Order, ScreenshotStatus
+
+ALLOWED_FORMATS = {'PNG', 'JPEG'}
+MAX_PIXELS = 50_000_000  # refuse decompression bombs well below Pillow's own limit
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def incoming_path(app, order_id):
+    return os.path.join(app.config['UPLOAD_INCOMING_FOLDER'], f'{order_id}.upload')
+
+def thumbnail_name(filename):
+    """Thumbnail file stored next to a processed screenshot"""
+    root, ext = os.path.splitext(filename)
+    return f'{root}_thumb{ext}'
+
+def stage_upload(app, file):
+    """Write the raw upload to disk and fsync it; returns the staged path.
+
+    Done before the order's transaction starts, so the database write lock
+    is not held while the bytes hit the disk.
+    """
+    folder = app.config['UPLOAD_INCOMING_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f'{uuid.uuid4().hex}.part')
+    with open(path, 'wb') as out:
+        file.save(out)
+        out.flush()
+        os.fsync(out.fileno())
+    return path
+
+def claim_upload(app, staged, order_id):
+    """Hand a staged upload to an order for the background pipeline"""
+    os.replace(staged, incoming_path(app, order_id))
+
+def get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config['SCREENSHOT_WORKERS'],
+                thread_name_prefix='screenshot'
+            )
+    return _executor
+
+def submit_screenshot(app, order_id):
+    """Queue an order's uploaded screenshot for processing; returns the Future."""
+    return get_executor(app).submit(process_screenshot, app, order_id)
+
+def encode_webp(image, size, quality):
+    copy = image.copy()
+    copy.thumbnail((size, size), Image.LANCZOS)
+    copy.info = {}  # no EXIF, XMP or ICC carried into the output
+    out = BytesIO()
+    copy.save(out, 'WEBP', quality=quality, method=4)
+    return out.getvalue()
+
+def write_file(path, data):
+    partial = path + '.part'
+    with open(partial, 'wb') as out:
+        out.write(data)
+    os.replace(partial, path)
+
+def process_screenshot(app, order_id):
+    """Validate, strip, re-encode and thumbnail one order's uploaded screenshot.
+
+    The result is a WebP named after a hash of its content, so a URL never
+    changes meaning and can be cached for as long as the browser likes.
+    Unreadable or oversized uploads mark the order INVALID for the admin.
+    """
+    with app.app_context():
+        config = app.config
+        path = incoming_path(app, order_id)
+        order = db.session.get(Order, order_id)
+        if order is None or order.screenshot_status != ScreenshotStatus.PENDING:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        if not os.path.exists(path):
+            order.screenshot_status = ScreenshotStatus.INVALID
+            db.session.commit()
+            return
+
+        try:
+            with Image.open(path) as probe:
+                if probe.format not in ALLOWED_FORMATS:
+                    raise ValueError(f'unsupported format {probe.format}')
+                if probe.width * probe.height > MAX_PIXELS:
+                    raise ValueError(f'image too large ({probe.width}x{probe.height})')
+                probe.verify()
+            with Image.open(path) as image:
+                # Let JPEG decode at reduced scale when it is far above the target size
+                image.draft('RGB', (config['SCREENSHOT_MAX_SIZE'], config['SCREENSHOT_MAX_SIZE']))
+                image = ImageOps.exif_transpose(image)
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+                full = encode_webp(image, config['SCREENSHOT_MAX_SIZE'], config['SCREENSHOT_QUALITY'])
+                thumb = encode_webp(image, config['SCREENSHOT_THUMB_SIZE'], config['SCREENSHOT_QUALITY'])
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as e:
+            app.logger.warning('Rejected screenshot for order #%s: %s', order_id, e)
+            order.screenshot_status = ScreenshotStatus.INVALID
+        else:
+            folder = config['UPLOAD_FOLDER']
+            os.makedirs(folder, exist_ok=True)
+            filename = f'{order.id}_{hashlib.sha256(full).hexdigest()[:16]}.webp'
+            write_file(os.path.join(folder, thumbnail_name(filename)), thumb)
+            write_file(os.path.join(folder, filename), full)
+            order.payment_screenshot = filename
+            order.screenshot_status = ScreenshotStatus.READY
+        db.session.commit()
+        os.remove(path)
+
+@click.command('process-screenshots')
+@with_appcontext
+def process_screenshots_command():
+    """Process uploads left PENDING, e.g. where the server runs no background threads."""
+    app = current_app._get_current_object()
+    order_ids = [order_id for order_id, in db.session.query(Order.id).filter(
+        Order.screenshot_status == ScreenshotStatus.PENDING)]
+    db.session.remove()
+    for order_id in order_ids:
+        process_screenshot(app, order_id)
+    click.echo(f'Processed {len(order_ids)} pending screenshots.')
@@ -0,0 +1,195 @@
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, insert, select
+from app import db
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus
+from app.stats import rebuild_event_stats
+
+# Rows per executemany call
+CHUNK_SIZE = 5000
+
+MEAL_NAMES = ('Standard', 'Vegetarian', 'Vegan', 'Chicken', 'Fish', 'Kids', 'Halal Beef', 'Gluten Free')
+VENUES = ('Grand Ballroom', 'Hall A', 'Hall B', 'Rooftop Terrace', 'Garden Pavilion', 'Conference Room 3')
+FEES = (15.0, 20.0, 25.0, 35.0, 50.0, 80.0)
+
+# (status, weight) per payment method; the first set is for events still to
+# come, where orders can be awaiting payment or verification
+UPCOMING_STATUSES = {
+    'touchngo': ((OrderStatus.PAID, 78), (OrderStatus.PROCESSING, 12), (OrderStatus.FAILED, 6),
+                 (OrderStatus.CANCELLED, 4)),
+    'stripe': ((OrderStatus.PAID, 86), (OrderStatus.PENDING, 3), (OrderStatus.FAILED, 8),
+               (OrderStatus.CANCELLED, 3)),
+}
+PAST_STATUSES = {
+    'touchngo': ((OrderStatus.PAID, 90), (OrderStatus.FAILED, 6), (OrderStatus.CANCELLED, 4)),
+    'stripe': ((OrderStatus.PAID, 89), (OrderStatus.FAILED, 8), (OrderStatus.CANCELLED, 3)),
+}
+PAYMENT_METHODS = (('touchngo', 62), ('stripe', 38))
+
+class SeedResult:
+    """Ids and timings of one seeding run."""
+
+    def __init__(self):
+        self.user_ids = []
+        self.event_ids = []
+        self.upcoming_event_ids = []
+        self.meals = []  # (meal option id, event id)
+        self.orders = 0
+        self.seconds = 0.0
+
+def weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+def bulk_insert(model, rows):
+    """INSERT rows in chunks through the driver's executemany."""
+    statement = insert(model.__table__)
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(statement, rows[start:start + CHUNK_SIZE])
+
+def bulk_insert_ids(model, rows):
+    """bulk_insert, then read back the new primary keys in insertion order.
+
+    Cheaper than INSERT ... RETURNING for large batches, and safe as long as
+    nothing else inserts into the table meanwhile, which holds for a seeding run.
+    """
+    last_id = db.session.scalar(select(func.max(model.id))) or 0
+    bulk_insert(model, rows)
+    return db.session.scalars(select(model.id).where(model.id > last_id).order_by(model.id)).all()
+
+def seed_database(users=1000, events=200, orders=10000, upcoming=20, rng=None):
+    """Bulk-insert synthetic users, events, meal options and orders.
+
+    Rows go in through chunked executemany INSERTs without building ORM
+    objects, so the after_flush stats hook does not run; event stats and
+    seat counts are rebuilt once at the end. The newest ``upcoming`` events
+    are in the future and open for booking; the rest are history. Order
+    volume per event is skewed towards a few popular events, stays within
+    capacity and never books a user twice for the same event.
+    """
+    rng = rng or random.Random()
+    result = SeedResult()
+    started = time.perf_counter()
+    now = datetime.utcnow()
+
+    # New telephones continue after the existing users so reruns don't collide
+    offset = (db.session.scalar(select(func.max(User.id))) or 0) + 1
+    result.user_ids = bulk_insert_ids(User, [
+        {'name': f'Guest {offset + i}', 'telephone': f'6099{offset + i:08d}',
+         'email': f'guest{offset + i}@example.com' if rng.random() < 0.4 else None, 'is_admin': False}
+        for i in range(users)
+    ])
+
+    event_rows = []
+    for i in range(events):
+        is_upcoming = i >= events - upcoming
+        date = (now + timedelta(days=rng.randint(1, 90)) if is_upcoming
+                else now - timedelta(days=rng.randint(1, 3 * 365)))
+        if is_upcoming:
+            status = EventStatus.ACTIVE
+        else:
+            status = EventStatus.CANCELLED if rng.random() < 0.08 else EventStatus.COMPLETED
+        event_rows.append({
+            'title': f'{rng.choice(("Charity", "Company", "Wedding", "Alumni", "Festive"))} Dinner #{i + 1}',
+            'description': 'Generated by flask seed',
+            'date': date.replace(hour=rng.choice((12, 13, 18, 19, 20)), minute=0, second=0, microsecond=0),
+            'location': rng.choice(VENUES),
+            'fee': rng.choice(FEES),
+            'admin_fee': 1.0,
+            'meal_required': 1 if rng.random() < 0.85 else 2,
+            'capacity': rng.choice((50, 80, 100, 150, 200, 300)) if rng.random() < 0.6 else None,
+            'status': status,
+            'updated_at': now,
+        })
+    result.event_ids = bulk_insert_ids(Event, event_rows)
+    result.upcoming_event_ids = result.event_ids[events - upcoming:] if upcoming else []
+    events_by_id = dict(zip(result.event_ids, event_rows))
+
+    meal_rows = [
+        {'event_id': event_id, 'name': name, 'description': f'{name} set menu', 'updated_at': now}
+        for event_id in result.event_ids
+        for name in rng.sample(MEAL_NAMES, rng.randint(1, 3))
+    ]
+    meal_ids = bulk_insert_ids(MealOption, meal_rows)
+    result.meals = [(meal_id, row['event_id']) for meal_id, row in zip(meal_ids, meal_rows)]
+    meals_by_event = {}
+    for meal_id, event_id in result.meals:
+        meals_by_event.setdefault(event_id, []).append(meal_id)
+
+    # Popularity follows a Zipf-like curve over a shuffled event order
+    ranked = list(result.event_ids)
+    rng.shuffle(ranked)
+    cumulative = list(accumulate(1.0 / (rank + 1) ** 0.8 for rank in range(len(ranked))))
+    seats = dict.fromkeys(result.event_ids, 0)
+    booked = set()
+    order_rows = []
+    attempts = 0
+    while len(order_rows) < orders and attempts < orders * 5 and result.user_ids:
+        attempts += 1
+        event_id = rng.choices(ranked, cum_weights=cumulative)[0]
+        user_id = rng.choice(result.user_ids)
+        event = events_by_id[event_id]
+        if (user_id, event_id) in booked:
+            continue
+        method = weighted(rng, PAYMENT_METHODS)
+        if event['status'] == EventStatus.CANCELLED:
+            status = OrderStatus.CANCELLED
+        elif event['date'] > now:
+            status = weighted(rng, UPCOMING_STATUSES[method])
+        else:
+            status = weighted(rng, PAST_STATUSES[method])
+        holds_seat = status in (OrderStatus.PENDING, OrderStatus.PROCESSING, OrderStatus.PAID)
+        if holds_seat:
+            if event['capacity'] is not None and seats[event_id] >= event['capacity']:
+                continue
+            seats[event_id] += 1
+            booked.add((user_id, event_id))
+
+        base_amount = event['fee'] * event['meal_required']
+        created_at = min(event['date'], now) - timedelta(minutes=rng.randint(10, 45 * 24 * 60))
+        if status == OrderStatus.PENDING:
+            created_at = now - timedelta(minutes=rng.randint(1, 25))  # a checkout still in progress
+        reference = None
+        if status == OrderStatus.PAID:
+            reference = (f'TNG-{created_at:%Y%m%d%H%M%S}' if method == 'touchngo'
+                         else f'pi_seed{len(order_rows):010d}')
+        order_rows.append({
+            'user_id': user_id,
+            'event_id': event_id,
+            'meal_option_id': rng.choice(meals_by_event[event_id]),
+            'amount': base_amount,
+            'admin_fee': round(base_amount * 0.03 + 1.0, 2) if method == 'stripe' else 0.0,
+            'payment_method': method,
+            'status': status,
+            'payment_reference': reference,
+            'created_at': created_at,
+        })
+    bulk_insert(Order, order_rows)
+    db.session.commit()
+    result.orders = len(order_rows)
+
+    rebuild_event_stats()
+    result.seconds = time.perf_counter() - started
+    return result
+
+@click.command('seed')
+@click.option('--users', type=int, default=1000, show_default=True, help='Customers to create.')
+@click.option('--events', type=int, default=200, show_default=True, help='Events to create.')
+@click.option('--orders', type=int, default=10000, show_default=True, help='Orders to spread over the new events.')
+@click.option('--upcoming', type=int, default=20, show_default=True,
+              help='How many of the new events are in the future and bookable.')
+@click.option('--seed', 'random_seed', type=int, help='Random seed, for a reproducible dataset.')
+@click.option('--yes', is_flag=True, help='Do not ask before adding to a database that already has data.')
+@with_appcontext
+def seed_command(users, events, orders, upcoming, random_seed, yes):
+    """Bulk-insert synthetic users, events, meals and orders for scale testing."""
+    if not yes and db.session.scalar(select(func.count(Event.id))):
+        click.confirm(f'{db.engine.url.render_as_string(hide_password=True)} already has events. '
+                      'Add synthetic data to it?', abort=True)
+    result = seed_database(users, events, orders, min(upcoming, events), random.Random(random_seed))
+    click.echo(f'Seeded {len(result.user_ids)} users, {len(result.event_ids)} events, '
+               f'{len(result.meals)} meal options and {result.orders} orders in {result.seconds:.1f}s.')
@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+from flask import current_app
+from app import db
+from app.models import SiteSetting
+
+_lock = threading.Lock()
+
+def read_stamp():
+    """Identity of the settings stamp file; changes whenever it is rewritten."""
+    try:
+        stat = os.stat(current_app.config['SETTINGS_STAMP_FILE'])
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def write_stamp(version):
+    path = current_app.config['SETTINGS_STAMP_FILE']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.{os.getpid()}'
+    with open(partial, 'w') as f:
+        f.write(str(version))
+    # Atomic replace gives the stamp a new inode, so every worker sees the change
+    os.replace(partial, path)
+
+def load_settings():
+    settings = SiteSetting.query.first()
+    if not settings:
+        return SimpleNamespace(transfer_phone='', version=0)
+    return SimpleNamespace(transfer_phone=settings.transfer_phone, version=settings.version)
+
+def get_site_settings():
+    """Site settings snapshot, re-read only when the stamp changes or the TTL expires."""
+    cached = current_app.extensions.get('site_settings')
+    stamp = read_stamp()
+    now = time.monotonic()
+    if cached and cached['stamp'] == stamp and now < cached['expires_at']:
+        return cached['settings']
+    with _lock:
+        settings = load_settings()
+        current_app.extensions['site_settings'] = {
+            'stamp': stamp,
+            'expires_at': now + current_app.config['SETTINGS_CACHE_TTL'],
+            'settings': settings
+        }
+    return settings
+
+def update_site_settings(**values):
+    """Save settings, bump their version and notify other workers via the stamp."""
+    settings = SiteSetting.query.first()
+    if not settings:
+        settings = SiteSetting(version=1, **values)
+        db.session.add(settings)
+    else:
+        for key, value in values.items():
+            setattr(settings, key, value)
+        settings.version = SiteSetting.version + 1
+    db.session.commit()
+    write_stamp(settings.version)
+    current_app.extensions.pop('site_settings', None)
+    return get_site_settings()
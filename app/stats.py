@@ -0,0 +1,222 @@
+from collections import defaultdict
+from sqlalchemy import event, func, inspect, select, delete, insert, update, bindparam
+from sqlalchemy.orm import NO_VALUE, Session
+from app import db
+from app.models import Event, Order, OrderStatus, EventOrderStat
+
+# Orders in these states hold a seat at the event
+SEAT_STATUSES = (OrderStatus.PENDING, OrderStatus.PROCESSING, OrderStatus.PAID)
+
+TRACKED_FIELDS = ('event_id', 'meal_option_id', 'status', 'amount', 'admin_fee')
+
+class EventSummary:
+    """Precomputed order figures for one event, built from EventOrderStat rows."""
+
+    def __init__(self):
+        self.orders_by_status = {status: 0 for status in OrderStatus}
+        self.seats_by_meal = defaultdict(int)
+        self.gross_amount = 0.0
+        self.admin_fees = 0.0
+
+    @property
+    def seats_taken(self):
+        return sum(self.seats_by_meal.values())
+
+    @property
+    def total_orders(self):
+        return sum(self.orders_by_status.values())
+
+    def add(self, stat):
+        self.orders_by_status[stat.status] += stat.order_count
+        if stat.status in SEAT_STATUSES:
+            self.seats_by_meal[stat.meal_option_id] += stat.order_count
+        if stat.status == OrderStatus.PAID:
+            self.gross_amount += stat.amount_total
+            self.admin_fees += stat.admin_fee_total
+
+def event_summaries(event_ids=None):
+    """Return {event_id: EventSummary} from the materialized stats table."""
+    query = EventOrderStat.query
+    if event_ids is not None:
+        query = query.filter(EventOrderStat.event_id.in_(event_ids))
+    summaries = defaultdict(EventSummary)
+    for stat in query:
+        summaries[stat.event_id].add(stat)
+    return summaries
+
+def refresh_event_stats(connection, event_ids):
+    """Recompute the stats rows for the given events from the order table."""
+    event_ids = sorted(event_ids)
+    if not event_ids:
+        return
+    order = Order.__table__
+    stat = EventOrderStat.__table__
+    event_table = Event.__table__
+    # Take each event's write lock first, in id order like the after_flush
+    # deltas, with the same no-op UPDATE reserve_seat uses. An order
+    # committed between the count and the overwrite below would otherwise
+    # be lost from seats_taken and the stats rows.
+    connection.execute(
+        update(event_table).where(event_table.c.id == bindparam('event'))
+        .values(seats_taken=event_table.c.seats_taken),
+        [{'event': event_id} for event_id in event_ids]
+    )
+    totals = connection.execute(
+        select(
+            order.c.event_id,
+            order.c.meal_option_id,
+            order.c.status,
+            func.count(),
+            func.coalesce(func.sum(order.c.amount), 0.0),
+            func.coalesce(func.sum(order.c.admin_fee), 0.0)
+        ).where(order.c.event_id.in_(event_ids), order.c.status.isnot(None))
+        .group_by(order.c.event_id, order.c.meal_option_id, order.c.status)
+    ).all()
+    connection.execute(delete(stat).where(stat.c.event_id.in_(event_ids)))
+
+    # Resync the capacity counter with the orders actually holding seats
+    seats = dict.fromkeys(event_ids, 0)
+    for event_id, _, status, count, _, _ in totals:
+        if status in SEAT_STATUSES:
+            seats[event_id] += count
+    connection.execute(
+        update(event_table).where(event_table.c.id == bindparam('event')),
+        [{'event': event_id, 'seats_taken': count} for event_id, count in seats.items()]
+    )
+
+    if totals:
+        connection.execute(insert(stat), [
+            {
+                'event_id': event_id,
+                'meal_option_id': meal_option_id,
+                'status': status,
+                'order_count': count,
+                'amount_total': amount,
+                'admin_fee_total': admin_fee
+            }
+            for event_id, meal_option_id, status, count, amount, admin_fee in totals
+        ])
+
+def rebuild_event_stats():
+    """Recompute every event's stats, e.g. after bulk inserts that bypass the ORM."""
+    event_ids = [row[0] for row in db.session.query(Event.id)]
+    connection = db.session.connection()
+    connection.execute(delete(EventOrderStat.__table__))
+    refresh_event_stats(connection, event_ids)
+    db.session.commit()
+
+def committed_values(state):
+    """An Order's tracked fields as last flushed, or None if one was never loaded."""
+    values = []
+    for field in TRACKED_FIELDS:
+        value = state.committed_state.get(field, state.dict.get(field, NO_VALUE))
+        if value is NO_VALUE:
+            return None
+        values.append(value)
+    return tuple(values)
+
+def current_values(state):
+    return tuple(state.dict.get(field) for field in TRACKED_FIELDS)
+
+def order_deltas(session):
+    """What this flush changes per stats row and per event's seat counter.
+
+    Returns (stats, seats, stale): {(event_id, meal_option_id, status):
+    [orders, amount, admin fee]}, {event_id: seats}, and the events with an
+    order whose previous values were never loaded, which need a full refresh.
+    """
+    stats = defaultdict(lambda: [0, 0.0, 0.0])
+    seats = defaultdict(int)
+    stale = set()
+
+    def count(values, sign):
+        event_id, meal_option_id, status, amount, admin_fee = values
+        if event_id is None or status is None:
+            return
+        row = stats[event_id, meal_option_id, status]
+        row[0] += sign
+        row[1] += sign * (amount or 0.0)
+        row[2] += sign * (admin_fee or 0.0)
+        seats[event_id] += sign if status in SEAT_STATUSES else 0
+
+    for obj in session.new:
+        if isinstance(obj, Order):
+            count(current_values(inspect(obj)), 1)
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Order):
+            continue
+        state = inspect(obj)
+        old = committed_values(state)
+        if old is None:
+            # e.g. an expired order assigned to without being reloaded
+            stale.update(value for value in (state.committed_state.get('event_id'), state.dict.get('event_id'))
+                         if value not in (None, NO_VALUE))
+            continue
+        new = None if obj in session.deleted else current_values(state)
+        if new != old:
+            count(old, -1)
+            if new is not None:
+                count(new, 1)
+    return stats, seats, stale
+
+def apply_order_deltas(connection, stats, seats):
+    """Add order_deltas to the stats rows and seat counters in place.
+
+    The counters go first: their row (or database) write lock serializes
+    writers per event, so a stats row cannot be inserted twice concurrently.
+    Returns the events whose stats rows turned out to be missing.
+    """
+    event_table = Event.__table__
+    stat = EventOrderStat.__table__
+    if seats:
+        connection.execute(
+            update(event_table).where(event_table.c.id == bindparam('event'))
+            .values(seats_taken=event_table.c.seats_taken + bindparam('delta')),
+            [{'event': event_id, 'delta': delta} for event_id, delta in sorted(seats.items())]
+        )
+
+    missing = set()
+    for (event_id, meal_option_id, status), (count, amount, admin_fee) in stats.items():
+        if not (count or amount or admin_fee):
+            continue
+        changed = connection.execute(
+            update(stat)
+            .where(stat.c.event_id == event_id,
+                   stat.c.meal_option_id.is_not_distinct_from(meal_option_id),
+                   stat.c.status == status)
+            .values(order_count=stat.c.order_count + count,
+                    amount_total=stat.c.amount_total + amount,
+                    admin_fee_total=stat.c.admin_fee_total + admin_fee)
+        ).rowcount
+        if changed:
+            continue
+        if count < 0:
+            # Orders left a row that was never there: rebuild the event
+            missing.add(event_id)
+            continue
+        connection.execute(insert(stat).values(
+            event_id=event_id,
+            meal_option_id=meal_option_id,
+            status=status,
+            order_count=count,
+            amount_total=amount,
+            admin_fee_total=admin_fee
+        ))
+    return missing
+
+@event.listens_for(Session, 'after_flush')
+def update_event_stats(session, flush_context):
+    """Keep EventOrderStat and seats_taken in step with every ORM change to Order rows.
+
+    Each changed order moves its count and totals from its old stats row to
+    its new one, a few single-row UPDATEs per flush. Bulk UPDATEs bypass
+    this hook and call refresh_event_stats instead.
+    """
+    stats, seats, stale = order_deltas(session)
+    for event_id in stale:
+        seats.pop(event_id, None)
+    stats = {key: totals for key, totals in stats.items() if key[0] not in stale}
+    if stats or seats:
+        stale |= apply_order_deltas(session.connection(), stats, seats)
+    if stale:
+        refresh_event_stats(session.connection(), stale)
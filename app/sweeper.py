@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import or_, select, update
+from app import db
+from app.models import Order, OrderStatus
+from app.stats import refresh_event_stats
+import click
+import threading
+import time
+
+class SweepResult:
+    """What one sweep reclaimed."""
+
+    def __init__(self):
+        self.expired = 0
+        self.batches = 0
+        self.events = set()
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {
+            'expired': self.expired,
+            'batches': self.batches,
+            'events': len(self.events),
+            'seconds': round(self.seconds, 3),
+        }
+
+def expire_stale_orders(max_age_minutes=None, batch_size=None):
+    """Fail PENDING Stripe orders whose latest Checkout Session started more
+    than max_age_minutes ago, batch by batch.
+
+    Each batch is one indexed SELECT of the oldest stale orders, one UPDATE
+    guarded on status (a webhook may have confirmed the order meanwhile) and
+    a stats refresh for the events involved, committed on its own so write
+    locks are held only briefly. Expired orders release their seats.
+    """
+    config = current_app.config
+    if max_age_minutes is None:
+        max_age_minutes = config['PENDING_ORDER_MAX_AGE_MINUTES']
+    if batch_size is None:
+        batch_size = config['ORDER_SWEEP_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(minutes=max_age_minutes)
+    result = SweepResult()
+    started = time.perf_counter()
+
+    while True:
+        batch = db.session.execute(
+            select(Order.id, Order.event_id)
+            .where(Order.status == OrderStatus.PENDING,
+                   Order.payment_method == 'stripe',
+                   # A retried checkout is never older than the order, so the
+                   # created_at range stays indexed and the retry time decides
+                   Order.created_at < cutoff,
+                   or_(Order.checkout_started_at.is_(None), Order.checkout_started_at < cutoff))
+            .order_by(Order.created_at)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        expired = db.session.execute(
+            update(Order)
+            .where(Order.id.in_([order_id for order_id, _ in batch]),
+                   Order.status == OrderStatus.PENDING)
+            .values(status=OrderStatus.FAILED)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        # Bulk UPDATEs bypass the after_flush hook, so refresh stats here
+        event_ids = {event_id for _, event_id in batch}
+        refresh_event_stats(db.session.connection(), event_ids)
+        db.session.commit()
+
+        result.expired += expired
+        result.batches += 1
+        result.events |= event_ids
+        if len(batch) < batch_size:
+            break
+
+    result.seconds = time.perf_counter() - started
+    if result.expired:
+        current_app.logger.info('Expired %s stale pending orders in %s batches (%.2fs)',
+                                result.expired, result.batches, result.seconds)
+    return result
+
+def run_sweeper(app, interval, stop):
+    """Sweep every ``interval`` seconds until ``stop`` is set."""
+    while not stop.wait(interval):
+        with app.app_context():
+            try:
+                result = expire_stale_orders()
+                totals = app.extensions['order_sweeper']
+                totals['runs'] += 1
+                totals['expired'] += result.expired
+                totals['last_run'] = datetime.utcnow()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Pending order sweep failed')
+
+def start_sweeper(app):
+    """Run the sweeper on a daemon thread in this process; returns its stop Event."""
+    stop = threading.Event()
+    app.extensions['order_sweeper'] = {'runs': 0, 'expired': 0, 'last_run': None}
+    thread = threading.Thread(target=run_sweeper, args=(app, app.config['ORDER_SWEEP_INTERVAL'], stop),
+                              name='order-sweeper', daemon=True)
+    thread.start()
+    return stop
+
+@click.command('expire-orders')
+@click.option('--max-age', type=int, help='Minutes a PENDING Stripe order may wait (default PENDING_ORDER_MAX_AGE_MINUTES).')
+@click.option('--batch-size', type=int, help='Orders per transaction (default ORDER_SWEEP_BATCH_SIZE).')
+@with_appcontext
+def expire_orders_command(max_age, batch_size):
+    """Expire abandoned PENDING Stripe orders and free their seats."""
+    result = expire_stale_orders(max_age, batch_size)
+    stats = result.as_dict()
+    click.echo(f"Expired {stats['expired']} orders across {stats['events']} events "
+               f"in {stats['batches']} batches ({stats['seconds']}s).")
@@ -0,0 +1,59 @@
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Order, OrderStatus, StripeEvent
+
+PAID_EVENTS = ('checkout.session.completed', 'checkout.session.async_payment_succeeded')
+FAILED_EVENTS = ('checkout.session.expired', 'checkout.session.async_payment_failed')
+
+def session_order_id(session):
+    """Our order id as attached to the Checkout Session by stripe_payment"""
+    order_id = (session.get('metadata') or {}).get('order_id') or session.get('client_reference_id')
+    try:
+        return int(order_id)
+    except (TypeError, ValueError):
+        return None
+
+def is_current_session(session, order):
+    """Whether the session is the order's latest, as recorded by stripe_payment.
+
+    A retried checkout reuses the pending order with a new session, so older
+    sessions for it keep expiring after the customer has moved on.
+    """
+    return (session.get('metadata') or {}).get('checkout_ref') == order.payment_reference
+
+def apply_stripe_event(event):
+    """Apply a verified Stripe event to its order, exactly once.
+
+    The StripeEvent row and the order change commit together, so a
+    redelivered or concurrently delivered event fails on the primary key
+    and changes nothing. Returns False for an event seen before.
+    """
+    session = event['data']['object']
+    order = None
+    if event['type'] in PAID_EVENTS + FAILED_EVENTS:
+        order_id = session_order_id(session)
+        # Row lock (where supported) so racing events for one order serialize
+        order = db.session.get(Order, order_id, with_for_update=True) if order_id else None
+
+    if order is not None:
+        if event['type'] in PAID_EVENTS and session.get('payment_status') == 'paid':
+            if order.status == OrderStatus.PENDING:
+                order.status = OrderStatus.PAID
+                order.payment_reference = session.get('payment_intent') or session['id']
+            elif order.status != OrderStatus.PAID:
+                # Paid after the order was given up (cancelled or expired): the
+                # seat may be gone, so leave it for an admin to refund or restore
+                current_app.logger.warning('Stripe payment for %s order #%s (event %s)',
+                                           order.status.value, order.id, event['id'])
+        elif event['type'] in FAILED_EVENTS and order.status == OrderStatus.PENDING \
+                and is_current_session(session, order):
+            order.status = OrderStatus.FAILED
+
+    db.session.add(StripeEvent(id=event['id'], type=event['type'], order_id=order.id if order else None))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    return True
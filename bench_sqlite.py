@@ -0,0 +1,83 @@
+"""Concurrent write benchmark for the SQLite connection profile.
+
+Runs the checkout write path (seat reservation + order insert + commit) from
+many threads against a fresh file database, once with SQLite's defaults and
+once with Config.SQLITE_PRAGMAS, and prints throughput for each.
+
+Usage: python bench_sqlite.py [--threads 16] [--writes 50]
+"""
+from app import create_app, db
+from app.capacity import reserve_seat
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus
+from config import Config
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy.exc import OperationalError
+import argparse
+import os
+import tempfile
+import time
+
+def make_config(path, pragmas):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        SQLITE_PRAGMAS = pragmas
+    return BenchConfig
+
+def run_profile(name, pragmas, threads, writes):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app(make_config(path, pragmas))
+    with app.app_context():
+        db.create_all()
+        event = Event(title="Bench Event", date=datetime.now() + timedelta(days=1), fee=10.0,
+                      status=EventStatus.ACTIVE)
+        db.session.add(event)
+        db.session.flush()
+        meal = MealOption(event_id=event.id, name="Standard")
+        db.session.add(meal)
+        # One customer per write: a customer holds at most one active booking per event
+        users = [User(name=f"Bench {i}", telephone=f"6017{i:07d}") for i in range(threads * writes)]
+        db.session.add_all(users)
+        db.session.commit()
+        event_id, meal_id = event.id, meal.id
+        user_ids = [u.id for u in users]
+
+    def worker(user_ids):
+        ok = failed = 0
+        with app.app_context():
+            for user_id in user_ids:
+                try:
+                    reserve_seat(event_id)
+                    db.session.add(Order(user_id=user_id, event_id=event_id, meal_option_id=meal_id,
+                                         amount=10.0, status=OrderStatus.PROCESSING,
+                                         payment_method='touchngo'))
+                    db.session.commit()
+                    ok += 1
+                except OperationalError:
+                    db.session.rollback()
+                    failed += 1
+        return ok, failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(worker, [user_ids[i::threads] for i in range(threads)]))
+    elapsed = time.perf_counter() - started
+
+    committed = sum(ok for ok, _ in results)
+    locked = sum(failed for _, failed in results)
+    with app.app_context():
+        db.engine.dispose()
+    print(f"{name:<10} {committed:>9} {locked:>8} {elapsed:>9.2f} {committed / elapsed:>10.1f}")
+    return committed / elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--writes', type=int, default=50, help='writes per thread')
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.writes} checkout writes")
+    print(f"{'profile':<10} {'committed':>9} {'locked':>8} {'seconds':>9} {'writes/s':>10}")
+    baseline = run_profile('default', {}, args.threads, args.writes)
+    tuned = run_profile('tuned', Config.SQLITE_PRAGMAS, args.threads, args.writes)
+    print(f"speedup: {tuned / baseline:.1f}x")
@@ -0,0 +1,196 @@
+"""Benchmark the booking funnel against a synthetic dataset.
+
+Seeds a temporary SQLite database, then has concurrent virtual customers
+walk events.list_events -> events.get_event -> payment.checkout -> Touch 'n Go
+upload while an admin approves each order through admin.verify_touchngo.
+Reports p50/p95/p99 latency and throughput per step.
+
+    python benchmark.py --threads 8 --funnels 400 --json results.json
+
+Run it on two commits with the same arguments (and --seed) to compare them;
+the JSON output records the commit it was taken on.
+"""
+from app import create_app, db
+from app.models import User, Event
+from app.screenshots import get_executor
+from app.seed import bulk_insert_ids, seed_database
+from config import Config
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from PIL import Image
+from sqlalchemy import update
+from verify_support import logged_in
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+STEPS = ('list_events', 'get_event', 'checkout', 'touchngo_upload', 'verify_touchngo')
+
+def make_app(workdir):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'benchmark.db')
+        UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+        UPLOAD_INCOMING_FOLDER = os.path.join(workdir, 'incoming')
+        SETTINGS_STAMP_FILE = os.path.join(workdir, 'site_settings.stamp')
+        EXPORT_FOLDER = os.path.join(workdir, 'exports')
+        STRIPE_SECRET_KEY = None
+
+    return create_app(BenchmarkConfig)
+
+def seed(app, events, users, orders, upcoming, funnels, rng):
+    """Seed history with flask seed's generator, plus an admin and fresh customers for the run.
+
+    Returns (admin id, funnel customer ids, bookable (event id, meal id) pairs).
+    """
+    with app.app_context():
+        db.create_all()
+        result = seed_database(users, events, orders, upcoming, rng)
+        admin_id, = bulk_insert_ids(User, [{'name': 'Benchmark Admin', 'telephone': '0000000000', 'is_admin': True}])
+        customer_ids = bulk_insert_ids(User, [
+            {'name': f'Funnel Customer {i}', 'telephone': f'6098{i:08d}', 'is_admin': False} for i in range(funnels)
+        ])
+        # Lift capacity limits so "fully booked" never shows up as a failed step
+        db.session.execute(update(Event).where(Event.id.in_(result.upcoming_event_ids)).values(capacity=None))
+        db.session.commit()
+        upcoming = set(result.upcoming_event_ids)
+        return admin_id, customer_ids, [(event_id, meal_id) for meal_id, event_id in result.meals if event_id in upcoming]
+
+def screenshot_bytes():
+    out = BytesIO()
+    Image.new('RGB', (720, 1280), (20, 110, 190)).save(out, 'PNG')
+    return out.getvalue()
+
+class Recorder:
+    """Latencies and failures per funnel step, shared by all worker threads."""
+
+    def __init__(self):
+        self.samples = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self._lock = threading.Lock()
+
+    def timed(self, step, call, ok):
+        started = time.perf_counter()
+        response = call()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples[step].append(elapsed)
+            if not ok(response):
+                self.errors[step] += 1
+        return response
+
+def run_funnel(app, recorder, admin_id, customer_id, event_id, meal_id, screenshot):
+    client = logged_in(app, customer_id)
+    recorder.timed('list_events', lambda: client.get('/events/'), lambda r: r.status_code == 200)
+    recorder.timed('get_event', lambda: client.get(f'/events/{event_id}'), lambda r: r.status_code == 200)
+    recorder.timed('checkout', lambda: client.get(f'/payment/checkout?event_id={event_id}&meal_id={meal_id}'),
+                   lambda r: r.status_code == 200)
+    response = recorder.timed('touchngo_upload', lambda: client.post('/payment/checkout', data={
+        'event_id': event_id,
+        'meal_id': meal_id,
+        'payment_method': 'touchngo',
+        'payment_screenshot': (BytesIO(screenshot), 'receipt.png'),
+    }, content_type='multipart/form-data'), lambda r: '/touchngo/confirmation/' in r.headers.get('Location', ''))
+    match = re.search(r'/touchngo/confirmation/(\d+)', response.headers.get('Location', ''))
+    if not match:
+        return
+    admin = logged_in(app, admin_id)
+    recorder.timed('verify_touchngo', lambda: admin.post(f'/admin/touchngo/verify/{match.group(1)}',
+                                                         data={'action': 'approve'}),
+                   lambda r: r.status_code == 302)
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a sorted list."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, int(round(q * len(samples))) - 1))]
+
+def summarize(recorder, wall_seconds):
+    results = {}
+    for step in STEPS:
+        samples = sorted(recorder.samples[step])
+        results[step] = {
+            'requests': len(samples),
+            'errors': recorder.errors[step],
+            'p50_ms': round(percentile(samples, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(samples, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(samples, 0.99) * 1000, 2),
+            'throughput_rps': round(len(samples) / wall_seconds, 1) if wall_seconds else 0.0,
+        }
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--events', type=int, default=2000, help='events to seed')
+    parser.add_argument('--upcoming', type=int, default=40, help='of which bookable in the next 90 days')
+    parser.add_argument('--users', type=int, default=5000, help='customers to seed')
+    parser.add_argument('--orders', type=int, default=20000, help='historical orders to seed')
+    parser.add_argument('--funnels', type=int, default=200, help='customers to walk through the funnel')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent customers')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the dataset and the run')
+    parser.add_argument('--json', metavar='PATH', help='also write the results to this file')
+    args = parser.parse_args(argv)
+    if not 0 < args.upcoming <= args.events:
+        parser.error('--upcoming must be between 1 and --events')
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='catering-bench-')
+    try:
+        app = make_app(workdir)
+        started = time.perf_counter()
+        admin_id, customer_ids, upcoming_meals = seed(app, args.events, args.users, args.orders, args.upcoming,
+                                                       args.funnels, rng)
+        print(f'Seeded {args.events} events, {args.users} users and {args.orders} orders '
+              f'in {time.perf_counter() - started:.1f}s')
+
+        screenshot = screenshot_bytes()
+        plan = [(customer_id,) + rng.choice(upcoming_meals) for customer_id in customer_ids]
+        recorder = Recorder()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            for future in [pool.submit(run_funnel, app, recorder, admin_id, customer_id, event_id, meal_id, screenshot)
+                           for customer_id, event_id, meal_id in plan]:
+                future.result()
+        wall_seconds = time.perf_counter() - started
+        results = summarize(recorder, wall_seconds)
+        # Let queued screenshots finish before their folder is deleted
+        get_executor(app).shutdown(wait=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f'\n{args.funnels} funnels on {args.threads} threads in {wall_seconds:.2f}s '
+          f'({args.funnels / wall_seconds:.1f} funnels/s)\n')
+    print(f'{"step":<18}{"requests":>9}{"errors":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"req/s":>9}')
+    for step, row in results.items():
+        print(f'{step:<18}{row["requests"]:>9}{row["errors"]:>8}{row["p50_ms"]:>10}{row["p95_ms"]:>10}'
+              f'{row["p99_ms"]:>10}{row["throughput_rps"]:>9}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'revision': git_revision(),
+                'taken_at': datetime.utcnow().isoformat(timespec='seconds'),
+                'arguments': vars(args),
+                'wall_seconds': round(wall_seconds, 3),
+                'funnels_per_second': round(args.funnels / wall_seconds, 2),
+                'steps': results,
+            }, f, indent=2)
+    return 1 if any(row['errors'] for row in results.values()) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,13 +11,99 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'instance', 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Engine pool settings for server databases such as PostgreSQL (SQLite
+    # ignores them). Size the pool so workers x (size + overflow) stays under
+    # the server's max_connections.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 5)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 10)
+    DB_POOL_PRE_PING = True
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)  # seconds
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS') or 0)  # PostgreSQL only, 0 = off
+
+    # Optional read replica; views marked @read_replica read from it
+    SQLALCHEMY_REPLICA_URI = os.environ.get('DATABASE_REPLICA_URL')
+
+    # Applied to each new SQLite connection (ignored for other databases).
+    # Set to {} to keep SQLite's defaults.
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL',
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 15000),
+        'cache_size': -20000,  # negative = KiB, i.e. ~20 MB page cache
+        'mmap_size': 128 * 1024 * 1024,
+    }
     
     # Stripe Configuration
     STRIPE_PUBLISHABLE_KEY = os.environ.get('STRIPE_PUBLISHABLE_KEY')
     STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
+    # Signing secret of the /payment/stripe/webhook endpoint (whsec_...)
+    STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
+    # Outbound Stripe calls (app.gateway); STRIPE_API_BASE points at a stand-in
+    STRIPE_API_BASE = os.environ.get('STRIPE_API_BASE')
+    STRIPE_CONNECT_TIMEOUT = 3.05  # seconds
+    STRIPE_READ_TIMEOUT = 10
+    STRIPE_MAX_RETRIES = 2
+    STRIPE_RETRY_BACKOFF = 0.25  # seconds, doubled per retry with full jitter
+    STRIPE_BREAKER_THRESHOLD = 5  # consecutive failed calls before failing fast
+    STRIPE_BREAKER_RESET = 30  # seconds before a trial call is let through
+    STRIPE_MAX_CONCURRENT = 4  # calls in flight per process
+    STRIPE_QUEUE_TIMEOUT = 1.0  # seconds to wait for a free slot
+    STRIPE_SESSION_TTL_MINUTES = 30  # Checkout Session lifetime (Stripe allows 30 min to 24 h)
+
+    # Abandoned-order sweeper (app.sweeper): `flask expire-orders` from cron,
+    # or ORDER_SWEEP_INTERVAL seconds > 0 to run it on a thread in each process.
+    # Keep the max age above the session TTL so no sweep races a live payment.
+    PENDING_ORDER_MAX_AGE_MINUTES = 60
+    ORDER_SWEEP_BATCH_SIZE = 500
+    ORDER_SWEEP_INTERVAL = int(os.environ.get('ORDER_SWEEP_INTERVAL') or 0)
     STRIPE_CURRENCY = 'myr'
     
     # File Upload Configuration - Use absolute path
     UPLOAD_FOLDER = os.path.join(basedir, 'app', 'static', 'uploads', 'payment_screenshots')
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+    # Raw uploads wait here (outside static/) until app.screenshots has
+    # validated, stripped and re-encoded them into UPLOAD_FOLDER
+    UPLOAD_INCOMING_FOLDER = os.path.join(basedir, 'instance', 'uploads')
+    SCREENSHOT_WORKERS = 2
+    SCREENSHOT_MAX_SIZE = 1600  # px, longest edge
+    SCREENSHOT_THUMB_SIZE = 320
+    SCREENSHOT_QUALITY = 80  # WebP quality
+    SCREENSHOT_CACHE_MAX_AGE = 365 * 24 * 3600  # uploads are immutable once written
+
+    # Admin order report page size (keyset paginated)
+    ADMIN_ORDERS_PER_PAGE = 50
+
+    # Background report exports are written here by a local worker pool
+    EXPORT_FOLDER = os.path.join(basedir, 'instance', 'exports')
+    EXPORT_WORKERS = 2
+
+    # In-process cache of the public event catalog (entries, seconds)
+    CATALOG_CACHE_SIZE = 256
+    CATALOG_CACHE_TTL = 300
+
+    # Site settings are cached per process; workers notice admin changes via
+    # this stamp file and otherwise re-read them every SETTINGS_CACHE_TTL seconds
+    SETTINGS_STAMP_FILE = os.path.join(basedir, 'instance', 'site_settings.stamp')
+    SETTINGS_CACHE_TTL = 300
+
+    # In-process cache of logged-in user identities (entries, seconds). The TTL
+    # bounds how long a role change made by another process goes unnoticed.
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = 60
+
+    # Opt-in request instrumentation (app.metrics): per-endpoint latency
+    # histograms, query counts and a log of statements slower than SLOW_QUERY_MS,
+    # shown at /admin/metrics. Set METRICS_TOKEN to let a Prometheus scraper read
+    # /admin/metrics/prometheus with "Authorization: Bearer <token>".
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS') or 100)
+    SLOW_QUERY_LOG_SIZE = 50
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Development guard against N+1 queries (app.querybudget): 'warn' logs and
+    # 'raise' fails the request once one relationship is lazily loaded more than
+    # LAZY_LOAD_THRESHOLD times in it. Unset means 'warn' in debug mode, else off.
+    LAZY_LOAD_GUARD = os.environ.get('LAZY_LOAD_GUARD')
+    LAZY_LOAD_THRESHOLD = int(os.environ.get('LAZY_LOAD_THRESHOLD') or 5)
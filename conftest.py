@@ -0,0 +1,15 @@
+import pytest
+from verify_support import app_query_budget
+
+@pytest.fixture
+def query_budget():
+    """Bind app.querybudget.query_budget to the app under test:
+
+        def test_my_orders(query_budget):
+            budget = query_budget(app)
+            with budget(max_queries=3, max_lazy_loads=0):
+                client.get('/orders/')
+
+    Run as scripts, the verify_*.py tests pass verify_support.app_query_budget.
+    """
+    yield app_query_budget
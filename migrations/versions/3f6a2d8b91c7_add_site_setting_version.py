@@ -0,0 +1,26 @@
+"""add site_setting version
+
+Revision ID: 3f6a2d8b91c7
+Revises: e41b7d9c0a6f
+Create Date: 2026-10-18 13:52:09.384410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6a2d8b91c7'
+down_revision = 'e41b7d9c0a6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('site_setting', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('site_setting', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,51 @@
+"""add event order stat
+
+Revision ID: 5d8f0b6e2c41
+Revises: c7e2a91d3f10
+Create Date: 2026-10-18 10:03:17.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8f0b6e2c41'
+down_revision = 'c7e2a91d3f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('event_order_stat',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('meal_option_id', sa.Integer(), nullable=True),
+    # orderstatus already exists: the order table created it
+    sa.Column('status', sa.Enum('PENDING', 'PAID', 'CANCELLED', 'FAILED', 'PROCESSING', name='orderstatus', create_type=False), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('amount_total', sa.Float(), nullable=False),
+    sa.Column('admin_fee_total', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['event.id'], ),
+    sa.ForeignKeyConstraint(['meal_option_id'], ['meal_option.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id', 'meal_option_id', 'status', name='uq_event_order_stat')
+    )
+    with op.batch_alter_table('event_order_stat', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_event_order_stat_event_id'), ['event_id'], unique=False)
+
+    # Backfill from existing orders
+    op.execute(
+        'INSERT INTO event_order_stat '
+        '(event_id, meal_option_id, status, order_count, amount_total, admin_fee_total) '
+        'SELECT event_id, meal_option_id, status, COUNT(*), COALESCE(SUM(amount), 0), '
+        'COALESCE(SUM(admin_fee), 0) FROM "order" WHERE status IS NOT NULL '
+        'GROUP BY event_id, meal_option_id, status'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('event_order_stat', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_event_order_stat_event_id'))
+
+    op.drop_table('event_order_stat')
@@ -0,0 +1,80 @@
+"""add active booking unique index
+
+Revision ID: 6c1e9f3a4d58
+Revises: b58e1c3a7d02
+Create Date: 2026-10-18 16:05:12.418530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1e9f3a4d58'
+down_revision = 'b58e1c3a7d02'
+branch_labels = None
+depends_on = None
+
+ACTIVE = "status IN ('PENDING', 'PROCESSING', 'PAID')"
+
+
+def upgrade():
+    # Existing duplicates would block the index: keep the most advanced
+    # active order per (user, event) -- PAID, then PROCESSING, then the
+    # newest -- fail unpaid extras and cancel paid/processing ones so
+    # they stay visible in the admin report for a refund.
+    connection = op.get_bind()
+    rows = connection.execute(sa.text(
+        'SELECT id, user_id, event_id, status FROM "order" WHERE ' + ACTIVE +
+        ' ORDER BY user_id, event_id,'
+        " CASE status WHEN 'PAID' THEN 0 WHEN 'PROCESSING' THEN 1 ELSE 2 END, id DESC"
+    )).fetchall()
+    seen = set()
+    affected = set()
+    for order_id, user_id, event_id, status in rows:
+        if (user_id, event_id) not in seen:
+            seen.add((user_id, event_id))
+            continue
+        connection.execute(
+            sa.text('UPDATE "order" SET status = :status WHERE id = :id'),
+            {'status': 'FAILED' if status == 'PENDING' else 'CANCELLED', 'id': order_id},
+        )
+        affected.add(event_id)
+
+    # The raw UPDATEs bypass the ORM stats hook: recompute event_order_stat
+    # and seats_taken for those events as the 5d8f0b6e2c41/9a3c4e1f7b25
+    # backfills did, so no phantom seats are left behind
+    if affected:
+        events = sa.bindparam('events', expanding=True)
+        params = {'events': sorted(affected)}
+        connection.execute(
+            sa.text('DELETE FROM event_order_stat WHERE event_id IN :events').bindparams(events), params)
+        connection.execute(sa.text(
+            'INSERT INTO event_order_stat '
+            '(event_id, meal_option_id, status, order_count, amount_total, admin_fee_total) '
+            'SELECT event_id, meal_option_id, status, COUNT(*), COALESCE(SUM(amount), 0), '
+            'COALESCE(SUM(admin_fee), 0) FROM "order" WHERE status IS NOT NULL AND event_id IN :events '
+            'GROUP BY event_id, meal_option_id, status'
+        ).bindparams(events), params)
+        connection.execute(sa.text(
+            'UPDATE event SET seats_taken = (SELECT COUNT(*) FROM "order" '
+            'WHERE "order".event_id = event.id '
+            "AND \"order\".status IN ('PENDING', 'PROCESSING', 'PAID')) "
+            'WHERE id IN :events'
+        ).bindparams(events), params)
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.create_index('uq_order_active_booking', ['user_id', 'event_id'], unique=True,
+                              sqlite_where=sa.text(ACTIVE), postgresql_where=sa.text(ACTIVE))
+
+    # ### end Alembic commands ###
+
+
+def downgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_index('uq_order_active_booking', sqlite_where=sa.text(ACTIVE),
+                            postgresql_where=sa.text(ACTIVE))
+
+    # ### end Alembic commands ###
@@ -0,0 +1,33 @@
+"""add event seats_taken
+
+Revision ID: 9a3c4e1f7b25
+Revises: 5d8f0b6e2c41
+Create Date: 2026-10-18 11:26:05.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3c4e1f7b25'
+down_revision = '5d8f0b6e2c41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('seats_taken', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from orders that currently hold a seat
+    op.execute(
+        'UPDATE event SET seats_taken = (SELECT COUNT(*) FROM "order" '
+        'WHERE "order".event_id = event.id '
+        "AND \"order\".status IN ('PENDING', 'PROCESSING', 'PAID'))"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_column('seats_taken')
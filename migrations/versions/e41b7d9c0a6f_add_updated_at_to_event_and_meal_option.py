@@ -0,0 +1,35 @@
+"""add updated_at to event and meal_option
+
+Revision ID: e41b7d9c0a6f
+Revises: 9a3c4e1f7b25
+Create Date: 2026-10-18 12:40:51.702215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41b7d9c0a6f'
+down_revision = '9a3c4e1f7b25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('meal_option', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute('UPDATE event SET updated_at = CURRENT_TIMESTAMP')
+    op.execute('UPDATE meal_option SET updated_at = CURRENT_TIMESTAMP')
+
+
+def downgrade():
+    with op.batch_alter_table('meal_option', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
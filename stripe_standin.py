@@ -0,0 +1,130 @@
+"""Local Stripe stand-in for the verify scripts.
+
+Serves the Checkout Sessions API on a loopback port and builds webhook
+events signed the way Stripe signs them, so the checkout -> webhook flow
+runs through the real app.gateway client without a Stripe account. It can
+also be told to answer slowly or with errors.
+
+    with LocalStripe('whsec_test') as gateway:
+        app.config['STRIPE_API_BASE'] = gateway.api_base
+        client.get(f'/payment/stripe/{event_id}/{meal_id}')
+        gateway.deliver(client, gateway.completed(gateway.sessions[-1]))
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+import uuid
+
+def signature_header(payload, secret, timestamp=None):
+    """Stripe-Signature header value for a raw payload"""
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    signed = f'{timestamp}.'.encode() + payload
+    digest = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={digest}'
+
+def unflatten(pairs):
+    """Nest Stripe's form encoding: metadata[order_id]=3 -> {'metadata': {'order_id': '3'}}"""
+    params = {}
+    for key, value in pairs:
+        parts = re.findall(r'[^\[\]]+', key)
+        target = params
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return params
+
+class LocalStripe:
+    def __init__(self, webhook_secret):
+        self.webhook_secret = webhook_secret
+        self.sessions = []
+        self.calls = 0  # API requests received, including failed ones
+        self.fail_next = 0  # answer this many upcoming requests with a 500
+        self.delay = 0.0  # seconds to stall before answering
+        self.idempotency_keys = []  # as sent with each request
+        self._by_key = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def api_base(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+                status, payload = standin.handle(self.path, parse_qsl(body),
+                                                 self.headers.get('Idempotency-Key'))
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle(self, path, pairs, idempotency_key):
+        with self._lock:
+            self.calls += 1
+            self.idempotency_keys.append(idempotency_key)
+            failing = self.fail_next > 0
+            self.fail_next -= failing
+            delay = self.delay
+        if delay:
+            time.sleep(delay)
+        if failing:
+            return 500, {'error': {'type': 'api_error', 'message': 'Stand-in outage'}}
+        if path != '/v1/checkout/sessions':
+            return 404, {'error': {'type': 'invalid_request_error', 'message': f'Unknown path {path}'}}
+        with self._lock:
+            # Like Stripe, a repeated idempotency key replays the first result
+            if idempotency_key in self._by_key:
+                return 200, self._by_key[idempotency_key]
+            session = dict(unflatten(pairs), id=f'cs_test_{uuid.uuid4().hex}', object='checkout.session',
+                           payment_status='unpaid', payment_intent=None)
+            session['url'] = f'https://checkout.stripe.test/{session["id"]}'
+            self.sessions.append(session)
+            if idempotency_key:
+                self._by_key[idempotency_key] = session
+        return 200, session
+
+    def event(self, event_type, session, **changes):
+        """A Checkout Session event as Stripe would send it"""
+        obj = {key: session[key] for key in ('id', 'object', 'client_reference_id', 'metadata',
+                                             'payment_status', 'payment_intent') if key in session}
+        obj.update(changes)
+        return {'id': f'evt_{uuid.uuid4().hex}', 'object': 'event', 'type': event_type,
+                'data': {'object': obj}}
+
+    def completed(self, session):
+        return self.event('checkout.session.completed', session, payment_status='paid',
+                          payment_intent=f'pi_{uuid.uuid4().hex[:24]}')
+
+    def expired(self, session):
+        return self.event('checkout.session.expired', session)
+
+    def deliver(self, client, event, secret=None):
+        """POST an event to the webhook endpoint with a valid (or given) signature"""
+        payload = json.dumps(event).encode()
+        header = signature_header(payload, secret or self.webhook_secret)
+        return client.post('/payment/stripe/webhook', data=payload, content_type='application/json',
+                           headers={'Stripe-Signature': header})
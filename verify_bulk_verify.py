@@ -0,0 +1,111 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus, ScreenshotStatus
+from app.stats import event_summaries
+from datetime import datetime, timedelta
+from sqlalchemy import event as sa_event
+from verify_support import VerifyConfig, logged_in
+import sys
+
+BACKLOG = 300
+
+def test_bulk_verify():
+    print("Testing Bulk Touch n Go Verification...")
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+        admin = User(name="Bulk Admin", telephone="0000000000", is_admin=True)
+        event = Event(title="Backlog Banquet", date=datetime.now() + timedelta(days=2), fee=12.0,
+                      capacity=BACKLOG + 10, status=EventStatus.ACTIVE)
+        db.session.add_all([admin, event])
+        db.session.flush()
+        meal = MealOption(event_id=event.id, name="Standard")
+        db.session.add(meal)
+        customers = [User(name=f"Payer {i}", telephone=f"6015{i:07d}") for i in range(BACKLOG + 4)]
+        db.session.add_all(customers)
+        db.session.flush()
+        orders = [Order(user_id=c.id, event_id=event.id, meal_option_id=meal.id, amount=12.0,
+                        status=OrderStatus.PROCESSING, payment_method='touchngo',
+                        screenshot_status=ScreenshotStatus.READY) for c in customers[:BACKLOG]]
+        already_paid = Order(user_id=customers[BACKLOG].id, event_id=event.id, meal_option_id=meal.id,
+                             amount=12.0, status=OrderStatus.PAID, payment_method='touchngo')
+        card = Order(user_id=customers[BACKLOG + 1].id, event_id=event.id, meal_option_id=meal.id,
+                     amount=12.0, status=OrderStatus.PROCESSING, payment_method='stripe')
+        # Receipts still being processed, or unreadable, cannot be approved in bulk
+        unprocessed = Order(user_id=customers[BACKLOG + 2].id, event_id=event.id, meal_option_id=meal.id,
+                            amount=12.0, status=OrderStatus.PROCESSING, payment_method='touchngo',
+                            screenshot_status=ScreenshotStatus.PENDING)
+        unreadable = Order(user_id=customers[BACKLOG + 3].id, event_id=event.id, meal_option_id=meal.id,
+                           amount=12.0, status=OrderStatus.PROCESSING, payment_method='touchngo',
+                           screenshot_status=ScreenshotStatus.INVALID)
+        db.session.add_all(orders + [already_paid, card, unprocessed, unreadable])
+        db.session.commit()
+        admin_id, event_id = admin.id, event.id
+        backlog_ids = [o.id for o in orders]
+        other_ids = [already_paid.id, card.id, unprocessed.id, unreadable.id]
+        unreadable_id = unreadable.id
+        engine = db.engine
+
+    client = logged_in(app, admin_id)
+
+    updates = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE "order"'):
+            updates.append(statement)
+
+    approve_ids = backlog_ids[:250] + other_ids
+    sa_event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.post('/admin/touchngo/verify/bulk', headers={'Accept': 'application/json'},
+                               data={'action': 'approve', 'order_ids': [str(i) for i in approve_ids]})
+    finally:
+        sa_event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    body = response.get_json()
+    results = body['results']
+    approved = [i for i in backlog_ids[:250] if results[str(i)] == 'approved']
+    if response.status_code != 200 or len(approved) != 250 or body['updated'] != 250:
+        print(f"FAILURE: Bulk approve returned {response.status_code} with {len(approved)} approved.")
+        sys.exit(1)
+    if any(results[str(i)] != 'skipped' for i in other_ids):
+        print(f"FAILURE: Handled or unreviewable orders were not skipped: {[results[str(i)] for i in other_ids]}")
+        sys.exit(1)
+    if len(updates) != 1:
+        print(f"FAILURE: Bulk approve ran {len(updates)} UPDATE statements.")
+        sys.exit(1)
+    print("SUCCESS: 250 payments approved with a single UPDATE; handled and unreviewable orders skipped.")
+
+    response = client.post('/admin/touchngo/verify/bulk', data={
+        'action': 'reject', 'order_ids': [str(i) for i in backlog_ids[250:] + [unreadable_id]]})
+    with app.app_context():
+        statuses = [status for status, in db.session.query(Order.status).filter(Order.id.in_(backlog_ids))]
+        unreadable_status = db.session.get(Order, unreadable_id).status
+        summary = event_summaries([event_id])[event_id]
+    if response.status_code != 302 or statuses.count(OrderStatus.PAID) != 250 or statuses.count(OrderStatus.FAILED) != 50 \
+            or unreadable_status != OrderStatus.FAILED:
+        print("FAILURE: Bulk reject from the form did not apply.")
+        sys.exit(1)
+    # 250 approved + 1 already paid; the card and unprocessed orders still hold seats
+    paid = summary.orders_by_status[OrderStatus.PAID]
+    if paid != 251 or summary.seats_taken != 253:
+        print(f"FAILURE: Stats not refreshed (paid {paid}, seats {summary.seats_taken}).")
+        sys.exit(1)
+    print("SUCCESS: Form rejection frees seats and keeps event stats current.")
+
+    bad = client.post('/admin/touchngo/verify/bulk', headers={'Accept': 'application/json'},
+                      data={'action': 'delete', 'order_ids': [str(backlog_ids[0])]})
+    if bad.status_code == 400:
+        print("SUCCESS: Unknown bulk actions are refused.")
+    else:
+        print(f"FAILURE: Unknown action returned {bad.status_code}.")
+        sys.exit(1)
+
+    with app.app_context():
+        db.drop_all()
+
+if __name__ == "__main__":
+    try:
+        test_bulk_verify()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
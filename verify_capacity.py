@@ -0,0 +1,106 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus
+from app.stats import SEAT_STATUSES
+from config import Config
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+from verify_support import logged_in
+import os
+import sys
+import tempfile
+
+CAPACITY = 5
+CUSTOMERS = 40
+
+def test_concurrent_checkout_capacity():
+    print("Testing Capacity Under Concurrent Checkout...")
+    workdir = tempfile.mkdtemp()
+
+    class VerifyConfig(Config):
+        # File database so each request thread gets its own connection
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'capacity.db')
+        UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+        UPLOAD_INCOMING_FOLDER = os.path.join(workdir, 'incoming')
+        # No key: Stripe fails fast instead of calling out over the network
+        STRIPE_SECRET_KEY = None
+
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+        event = Event(title="Launch Dinner", date=datetime.now() + timedelta(days=7), fee=30.0,
+                      capacity=CAPACITY, status=EventStatus.ACTIVE)
+        db.session.add(event)
+        db.session.flush()
+        meal = MealOption(event_id=event.id, name="Standard")
+        db.session.add(meal)
+        customers = [User(name=f"Rush {i}", telephone=f"60199{i:05d}") for i in range(CUSTOMERS)]
+        db.session.add_all(customers)
+        db.session.commit()
+        event_id, meal_id = event.id, meal.id
+        customer_ids = [c.id for c in customers]
+
+    def checkout(user_id):
+        client = logged_in(app, user_id)
+        response = client.post('/payment/checkout', data={
+            'event_id': event_id,
+            'meal_id': meal_id,
+            'payment_method': 'touchngo',
+            'payment_screenshot': (BytesIO(b'\x89PNG fake'), 'proof.png'),
+        }, content_type='multipart/form-data')
+        return response.status_code
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        statuses = list(pool.map(checkout, customer_ids))
+
+    with app.app_context():
+        held = Order.query.filter(Order.event_id == event_id, Order.status.in_(SEAT_STATUSES)).count()
+        event = db.session.get(Event, event_id)
+        errors = [code for code in statuses if code >= 500]
+
+        if errors:
+            print(f"FAILURE: {len(errors)} checkouts errored: {errors[:5]}")
+            sys.exit(1)
+        if held > CAPACITY:
+            print(f"FAILURE: Oversold event: {held} seats held for capacity {CAPACITY}.")
+            sys.exit(1)
+        if held != CAPACITY or event.seats_taken != held:
+            print(f"FAILURE: Expected {CAPACITY} seats held, got {held} (counter {event.seats_taken}).")
+            sys.exit(1)
+        print(f"SUCCESS: {CUSTOMERS} parallel checkouts filled exactly {CAPACITY} seats.")
+
+        # Rejecting a payment hands its seat back
+        rejected = Order.query.filter_by(event_id=event_id).first()
+        rejected.status = OrderStatus.FAILED
+        db.session.commit()
+        if db.session.get(Event, event_id).seats_taken != CAPACITY - 1:
+            print("FAILURE: Failed order did not release its seat.")
+            sys.exit(1)
+
+        # Stripe is unreachable here: the order reserves the freed seat, fails,
+        # and must release it again
+        late = User(name="Late Customer", telephone="60188888888")
+        db.session.add(late)
+        db.session.commit()
+        late_id = late.id
+
+    client = logged_in(app, late_id)
+    client.get(f'/payment/stripe/{event_id}/{meal_id}')
+
+    with app.app_context():
+        stripe_order = Order.query.filter_by(user_id=late_id, payment_method='stripe').first()
+        seats = db.session.get(Event, event_id).seats_taken
+        if stripe_order and stripe_order.status == OrderStatus.FAILED and seats == CAPACITY - 1:
+            print("SUCCESS: Failed, rejected and errored orders release their seats.")
+        else:
+            print(f"FAILURE: Seat counter is {seats} after a failed Stripe checkout.")
+            sys.exit(1)
+
+        db.drop_all()
+
+if __name__ == "__main__":
+    try:
+        test_concurrent_checkout_capacity()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
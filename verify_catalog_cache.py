@@ -0,0 +1,137 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, EventStatus
+from datetime import datetime, timedelta
+from verify_support import VerifyConfig, app_query_budget, logged_in
+import sys
+
+def test_catalog_cache(query_budget):
+    print("Testing Cached Event Catalog...")
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+
+        admin = User(name="Catalog Admin", telephone="0000000000", is_admin=True)
+        event = Event(title="Cached Brunch", date=datetime.now() + timedelta(days=3), location="Hall A",
+                      fee=25.0, status=EventStatus.ACTIVE)
+        db.session.add_all([admin, event])
+        db.session.flush()
+        db.session.add(MealOption(event_id=event.id, name="Standard", description="Nasi lemak"))
+        db.session.add(MealOption(event_id=event.id, name="Vegetarian"))
+        db.session.commit()
+        admin_id, event_id, event_date = admin.id, event.id, event.date
+
+    # Requests run outside the setup context so each gets its own app context
+    budget = query_budget(app)
+    client = app.test_client()
+    for url in ('/events/', f'/events/{event_id}'):
+        with budget() as cold:
+            first = client.get(url)
+        with budget(max_queries=0):
+            second = client.get(url)
+        if first.status_code != 200 or second.data != first.data:
+            print(f"FAILURE: Cached {url} renders differently.")
+            sys.exit(1)
+        if cold.count == 0:
+            print(f"FAILURE: {url} was served from the cache before it was filled.")
+            sys.exit(1)
+    print("SUCCESS: Warm catalog pages make no database queries.")
+
+    if client.get('/events/9999').status_code != 404:
+        print("FAILURE: Unknown event did not 404.")
+        sys.exit(1)
+
+    admin_client = logged_in(app, admin_id)
+    admin_client.post(f'/admin/events/{event_id}/edit', data={
+        'title': 'Renamed Brunch',
+        'date': event_date.strftime('%Y-%m-%dT%H:%M'),
+        'location': 'Hall B',
+        'fee': '25.0',
+        'admin_fee': '1.0',
+        'meal_required': '1',
+    })
+    listing = client.get('/events/').get_data(as_text=True)
+    detail = client.get(f'/events/{event_id}').get_data(as_text=True)
+    if 'Renamed Brunch' in listing and 'Hall B' in detail:
+        print("SUCCESS: Admin edit invalidates cached listing and detail.")
+    else:
+        print("FAILURE: Stale catalog served after admin edit.")
+        sys.exit(1)
+
+    admin_client.post(f'/admin/events/{event_id}/cancel')
+    if 'Renamed Brunch' not in client.get('/events/').get_data(as_text=True):
+        print("SUCCESS: Cancelled event dropped from cached listing.")
+    else:
+        print("FAILURE: Cancelled event still listed.")
+        sys.exit(1)
+
+    with app.app_context():
+        db.drop_all()
+
+def test_conditional_requests(query_budget):
+    print("Testing ETag / Last-Modified on Event Pages...")
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+        admin = User(name="Catalog Admin", telephone="0000000000", is_admin=True)
+        event = Event(title="Conditional Lunch", date=datetime.now() + timedelta(days=3), location="Hall A",
+                      fee=25.0, status=EventStatus.ACTIVE)
+        db.session.add_all([admin, event])
+        db.session.flush()
+        db.session.add(MealOption(event_id=event.id, name="Standard"))
+        db.session.commit()
+        admin_id, event_id, event_date = admin.id, event.id, event.date
+
+    budget = query_budget(app)
+    client = app.test_client()
+    for url in ('/events/', f'/events/{event_id}'):
+        first = client.get(url)
+        if not first.headers.get('ETag'):
+            print(f"FAILURE: {url} sent no ETag.")
+            sys.exit(1)
+        with budget(max_queries=0):
+            second = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        if second.status_code != 304 or second.data:
+            print(f"FAILURE: {url} returned {second.status_code} for a matching ETag.")
+            sys.exit(1)
+    print("SUCCESS: Matching ETags get 304 Not Modified without touching the database.")
+
+    detail = client.get(f'/events/{event_id}')
+    second = client.get(f'/events/{event_id}', headers={'If-Modified-Since': detail.headers['Last-Modified']})
+    if second.status_code != 304:
+        print("FAILURE: If-Modified-Since did not revalidate the detail page.")
+        sys.exit(1)
+    print("SUCCESS: Last-Modified revalidates the detail page.")
+
+    admin_client = logged_in(app, admin_id)
+    listing = client.get('/events/')
+    # An admin's navbar differs, so the same data must not share an ETag
+    if admin_client.get('/events/').headers['ETag'] == listing.headers['ETag']:
+        print("FAILURE: Anonymous and admin views share an ETag.")
+        sys.exit(1)
+
+    admin_client.post(f'/admin/events/{event_id}/edit', data={
+        'title': 'Conditional Lunch',
+        'date': event_date.strftime('%Y-%m-%dT%H:%M'),
+        'location': 'Hall A',
+        'fee': '25.0',
+        'admin_fee': '1.0',
+        'meal_required': '1',
+        'meal_0_description': 'Chicken rice',
+    })
+    for url, old in ((f'/events/{event_id}', detail), ('/events/', listing)):
+        after = client.get(url, headers={'If-None-Match': old.headers['ETag']})
+        if after.status_code != 200:
+            print(f"FAILURE: {url} still 304 after a meal option edit.")
+            sys.exit(1)
+    print("SUCCESS: Meal option edits change the validators.")
+
+    with app.app_context():
+        db.drop_all()
+
+if __name__ == "__main__":
+    try:
+        test_catalog_cache(app_query_budget)
+        test_conditional_requests(app_query_budget)
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
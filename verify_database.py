@@ -0,0 +1,108 @@
+from app import create_app, db
+from app.database import engine_options
+from app.models import User, Event, EventStatus
+from config import Config
+from datetime import datetime, timedelta
+from flask import g
+from verify_support import logged_in
+import os
+import sqlite3
+import sys
+import tempfile
+
+def test_engine_options():
+    print("Testing Engine Pool Options...")
+
+    class PoolConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        DB_POOL_SIZE = 8
+        DB_MAX_OVERFLOW = 4
+        DB_POOL_RECYCLE = 600
+        DB_STATEMENT_TIMEOUT_MS = 3000
+
+    app = create_app(PoolConfig)
+    options = engine_options(app, 'postgresql://catering@db.internal/catering')
+    expected = {
+        'pool_size': 8,
+        'max_overflow': 4,
+        'pool_pre_ping': True,
+        'pool_recycle': 600,
+        'connect_args': {'options': '-c statement_timeout=3000'},
+    }
+    if options == expected and engine_options(app, 'sqlite:///app.db') == {}:
+        print("SUCCESS: PostgreSQL gets pool and statement timeout options; SQLite keeps defaults.")
+    else:
+        print(f"FAILURE: Unexpected engine options {options}")
+        sys.exit(1)
+
+def test_read_replica_routing():
+    print("Testing Read Replica Routing...")
+    workdir = tempfile.mkdtemp()
+    primary = os.path.join(workdir, 'primary.db')
+    replica = os.path.join(workdir, 'replica.db')
+
+    class ReplicaConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + primary
+        SQLALCHEMY_REPLICA_URI = 'sqlite:///' + replica
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        db.create_all()
+        admin = User(name="Replica Admin", telephone="0000000000", is_admin=True)
+        db.session.add_all([admin, Event(title="Replicated Feast", date=datetime.now() + timedelta(days=1),
+                                         fee=10.0, status=EventStatus.ACTIVE)])
+        db.session.commit()
+        admin_id = admin.id
+        event_id, event_date = db.session.query(Event.id, Event.date).one()
+        # Snapshot the primary as the replica, then write something it lacks
+        source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+        source.backup(target)
+        source.close()
+        target.close()
+        db.session.add(Event(title="Primary Only Feast", date=datetime.now() + timedelta(days=2),
+                             fee=10.0, status=EventStatus.ACTIVE))
+        db.session.commit()
+
+    with app.test_request_context():
+        g.use_read_replica = True
+        titles = {title for title, in db.session.query(Event.title)}
+    if titles == {'Replicated Feast'}:
+        print("SUCCESS: SELECTs in @read_replica views are served from the replica.")
+    else:
+        print(f"FAILURE: Replica-routed SELECT saw {titles}.")
+        sys.exit(1)
+
+    # The replica lags behind; the cached catalog must not pin its stale rows
+    public = app.test_client()
+    listing = public.get('/events/').get_data(as_text=True)
+    logged_in(app, admin_id).post(f'/admin/events/{event_id}/edit', data={
+        'title': 'Renamed Feast',
+        'date': event_date.strftime('%Y-%m-%dT%H:%M'),
+        'location': 'Hall A',
+        'fee': '10.0',
+        'admin_fee': '1.0',
+        'meal_required': '1',
+    })
+    renamed = public.get('/events/').get_data(as_text=True)
+    detail = public.get(f'/events/{event_id}').get_data(as_text=True)
+    if 'Primary Only Feast' in listing and 'Renamed Feast' in renamed and 'Renamed Feast' in detail:
+        print("SUCCESS: The event catalog cache is refilled from the primary after edits.")
+    else:
+        print("FAILURE: The event catalog was cached from the lagging replica.")
+        sys.exit(1)
+
+    client = logged_in(app, admin_id)
+    dashboard = client.get('/admin/dashboard').get_data(as_text=True)
+    if 'Primary Only Feast' in dashboard:
+        print("SUCCESS: Other pages keep reading from the primary.")
+    else:
+        print("FAILURE: Dashboard did not read from the primary.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        test_engine_options()
+        test_read_replica_routing()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
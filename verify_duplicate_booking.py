@@ -0,0 +1,147 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus
+from app.stats import SEAT_STATUSES
+from config import Config
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+from sqlalchemy import event as sa_event
+from stripe_standin import LocalStripe
+from types import SimpleNamespace
+from verify_support import logged_in
+import os
+import sys
+import tempfile
+
+CLICKS = 8
+
+def make_app():
+    workdir = tempfile.mkdtemp()
+
+    class VerifyConfig(Config):
+        # File database so each request thread gets its own connection
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'bookings.db')
+        UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+        UPLOAD_INCOMING_FOLDER = os.path.join(workdir, 'incoming')
+        STRIPE_SECRET_KEY = 'sk_test_standin'
+
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+        event = Event(title="Duplicate Dinner", date=datetime.now() + timedelta(days=7), fee=30.0,
+                      capacity=10, status=EventStatus.ACTIVE)
+        customer = User(name="Double Clicker", telephone="60123456789")
+        db.session.add_all([event, customer])
+        db.session.flush()
+        meal = MealOption(event_id=event.id, name="Standard")
+        db.session.add(meal)
+        db.session.commit()
+        ids = SimpleNamespace(event=event.id, meal=meal.id, customer=customer.id)
+    return app, ids
+
+def active_orders(app, ids):
+    with app.app_context():
+        orders = Order.query.filter(Order.event_id == ids.event, Order.status.in_(SEAT_STATUSES)).all()
+        return orders, db.session.get(Event, ids.event).seats_taken
+
+def test_touchngo_double_submit():
+    print("Testing Touch n Go Double Submit...")
+    app, ids = make_app()
+
+    def submit(_):
+        response = logged_in(app, ids.customer).post('/payment/checkout', data={
+            'event_id': ids.event,
+            'meal_id': ids.meal,
+            'payment_method': 'touchngo',
+            'payment_screenshot': (BytesIO(b'\x89PNG fake'), 'proof.png'),
+        }, content_type='multipart/form-data')
+        return response.status_code, response.headers.get('Location', '')
+
+    with ThreadPoolExecutor(max_workers=CLICKS) as pool:
+        results = list(pool.map(submit, range(CLICKS)))
+
+    orders, seats_taken = active_orders(app, ids)
+    if any(code >= 500 for code, _ in results):
+        print(f"FAILURE: Double submit errored: {results}")
+        sys.exit(1)
+    if len(orders) != 1 or seats_taken != 1:
+        print(f"FAILURE: {CLICKS} submits left {len(orders)} active orders and {seats_taken} seats taken.")
+        sys.exit(1)
+    confirmation = f'/payment/touchngo/confirmation/{orders[0].id}'
+    if not all(location.endswith(confirmation) for _, location in results):
+        print(f"FAILURE: Duplicate submits were not sent to the existing order: {results}")
+        sys.exit(1)
+    print(f"SUCCESS: {CLICKS} concurrent submits collapsed into one order.")
+
+def test_checkout_page_skips_order_reads():
+    print("Testing Checkout Page Queries...")
+    app, ids = make_app()
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client = logged_in(app, ids.customer)
+    sa_event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(f'/payment/checkout?event_id={ids.event}&meal_id={ids.meal}')
+    finally:
+        sa_event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    order_reads = [s for s in statements if 'FROM "order"' in s]
+    if response.status_code == 200 and not order_reads:
+        print("SUCCESS: Checkout page renders without reading orders.")
+    else:
+        print(f"FAILURE: Checkout page ran {len(order_reads)} order queries.")
+        sys.exit(1)
+
+def test_stripe_retry_reuses_order():
+    print("Testing Stripe Retry...")
+    app, ids = make_app()
+    with LocalStripe('whsec_verify') as gateway:
+        app.config['STRIPE_API_BASE'] = gateway.api_base
+        client = logged_in(app, ids.customer)
+        url = f'/payment/stripe/{ids.event}/{ids.meal}'
+        first, second = client.get(url), client.get(url)
+    sessions = gateway.sessions
+
+    orders, seats_taken = active_orders(app, ids)
+    if first.status_code != 303 or second.status_code != 303 or len(sessions) != 2:
+        print(f"FAILURE: Retry did not reach Stripe ({first.status_code}, {second.status_code}).")
+        sys.exit(1)
+    if len(orders) != 1 or seats_taken != 1 or orders[0].status != OrderStatus.PENDING:
+        print(f"FAILURE: Retry left {len(orders)} active orders and {seats_taken} seats taken.")
+        sys.exit(1)
+    if sessions[0]['success_url'] != sessions[1]['success_url']:
+        print("FAILURE: Retry opened a Stripe session for a different order.")
+        sys.exit(1)
+    print("SUCCESS: Stripe retry reuses the pending order and its seat.")
+
+    # A paid booking turns away both payment methods
+    with app.app_context():
+        order = db.session.get(Order, orders[0].id)
+        order.status = OrderStatus.PAID
+        db.session.commit()
+    response = client.post('/payment/checkout', data={
+        'event_id': ids.event,
+        'meal_id': ids.meal,
+        'payment_method': 'touchngo',
+        'payment_screenshot': (BytesIO(b'\x89PNG fake'), 'proof.png'),
+    }, content_type='multipart/form-data')
+    orders, _ = active_orders(app, ids)
+    if response.status_code == 302 and response.headers['Location'].endswith('/events/') and len(orders) == 1:
+        print("SUCCESS: Paid booking blocks another order.")
+    else:
+        print(f"FAILURE: Paid booking allowed another order ({len(orders)} active).")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        test_touchngo_double_submit()
+        test_checkout_page_skips_order_reads()
+        test_stripe_retry_reuses_order()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
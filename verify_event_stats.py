@@ -0,0 +1,132 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus
+from app.stats import event_summaries, rebuild_event_stats
+from datetime import datetime
+from sqlalchemy import event as sa_event
+from verify_support import VerifyConfig, logged_in
+import sys
+
+def test_event_stats():
+    print("Testing Per-Event Order Stats...")
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+
+        admin = User(name="Stats Admin", telephone="0000000000", is_admin=True)
+        db.session.add(admin)
+        event = Event(title="Stats Event", date=datetime.now(), fee=20.0, capacity=10, status=EventStatus.ACTIVE)
+        db.session.add(event)
+        db.session.flush()
+        standard = MealOption(event_id=event.id, name="Standard")
+        veg = MealOption(event_id=event.id, name="Vegetarian")
+        db.session.add_all([standard, veg])
+        db.session.flush()
+
+        orders = []
+        for i, (meal, status) in enumerate([
+            (standard, OrderStatus.PAID),
+            (standard, OrderStatus.PAID),
+            (veg, OrderStatus.PROCESSING),
+            (veg, OrderStatus.PENDING),
+            (standard, OrderStatus.FAILED),
+        ]):
+            customer = User(name=f"Customer {i}", telephone=f"6011000{i:03d}")
+            db.session.add(customer)
+            db.session.flush()
+            order = Order(user_id=customer.id, event_id=event.id, meal_option_id=meal.id,
+                          amount=20.0, admin_fee=1.6, status=status, payment_method='touchngo')
+            db.session.add(order)
+            orders.append(order)
+        db.session.commit()
+
+        summary = event_summaries()[event.id]
+        if (summary.orders_by_status[OrderStatus.PAID] == 2 and summary.seats_taken == 4
+                and summary.seats_by_meal[veg.id] == 2 and summary.gross_amount == 40.0):
+            print("SUCCESS: Stats reflect newly created orders.")
+        else:
+            print("FAILURE: Stats do not match created orders.")
+            sys.exit(1)
+
+        # Approve the processing order through the admin route
+        client = logged_in(app, admin.id)
+        client.post(f'/admin/touchngo/verify/{orders[2].id}', data={'action': 'approve'})
+
+        summary = event_summaries()[event.id]
+        if summary.orders_by_status[OrderStatus.PAID] == 3 and summary.orders_by_status[OrderStatus.PROCESSING] == 0:
+            print("SUCCESS: Stats follow status changes made in admin routes.")
+        else:
+            print("FAILURE: Stats missed an admin status change.")
+            sys.exit(1)
+
+        # A flush moves the order between stats rows without re-aggregating the event
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        sa_event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            db.session.get(Order, orders[3].id).status = OrderStatus.CANCELLED
+            db.session.commit()
+        finally:
+            sa_event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        summary = event_summaries()[event.id]
+        if any('GROUP BY' in statement or statement.startswith('DELETE') for statement in statements):
+            print(f"FAILURE: A single status change re-aggregated the event: {statements}")
+            sys.exit(1)
+        if summary.orders_by_status[OrderStatus.CANCELLED] != 1 or summary.seats_taken != 3 \
+                or db.session.get(Event, event.id).seats_taken != 3:
+            print("FAILURE: Cancelled order still counted as holding a seat.")
+            sys.exit(1)
+        print("SUCCESS: Status changes adjust only the stats rows they move between.")
+
+        # Assigning to an expired order leaves its old status unknown: the event is recomputed
+        failed = db.session.get(Order, orders[4].id)
+        db.session.expire(failed)
+        failed.status = OrderStatus.CANCELLED
+        db.session.commit()
+        summary = event_summaries()[event.id]
+        if summary.orders_by_status[OrderStatus.FAILED] != 0 or summary.orders_by_status[OrderStatus.CANCELLED] != 2:
+            print("FAILURE: Stats missed a change to an expired order.")
+            sys.exit(1)
+        print("SUCCESS: Changes to unloaded orders fall back to a full refresh.")
+
+        db.session.delete(db.session.get(Order, orders[0].id))
+        db.session.commit()
+        before = event_summaries()[event.id]
+        statements = []
+        sa_event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            rebuild_event_stats()
+        finally:
+            sa_event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        after = event_summaries()[event.id]
+        # The event rows are locked before their orders are counted
+        locked = next(i for i, statement in enumerate(statements) if statement.startswith('UPDATE event'))
+        counted = next(i for i, statement in enumerate(statements) if 'GROUP BY' in statement)
+        if locked > counted:
+            print("FAILURE: Orders were counted before the events were locked.")
+            sys.exit(1)
+        if (before.orders_by_status == after.orders_by_status and before.gross_amount == after.gross_amount
+                and before.seats_taken == after.seats_taken == db.session.get(Event, event.id).seats_taken == 2
+                and after.orders_by_status[OrderStatus.PAID] == 2):
+            print("SUCCESS: Incremental stats match a full rebuild.")
+        else:
+            print("FAILURE: Incremental stats drifted from a full rebuild.")
+            sys.exit(1)
+
+        response = client.get('/admin/dashboard')
+        if response.status_code == 200 and '2 / 10 seats' in ' '.join(response.get_data(as_text=True).split()):
+            print("SUCCESS: Dashboard shows precomputed seat counts.")
+        else:
+            print("FAILURE: Dashboard did not render stats.")
+            sys.exit(1)
+
+        db.drop_all()
+
+if __name__ == "__main__":
+    try:
+        test_event_stats()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
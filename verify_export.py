@@ -0,0 +1,184 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus
+from app.exports import export_rows_query, iter_export_batches, write_orders_workbook
+from app.seed import seed_database
+from datetime import datetime, timedelta
+from openpyxl import load_workbook
+from io import BytesIO
+from verify_support import VerifyConfig, logged_in
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+def seed_events():
+    admin = User(name="Export Admin", telephone="0000000000", is_admin=True)
+    db.session.add(admin)
+    db.session.flush()
+
+    events = []
+    for index, count in enumerate([3, 7, 0]):
+        event = Event(title=f"Export Event {index}", date=datetime.now() + timedelta(days=index),
+                      fee=10.0, status=EventStatus.ACTIVE)
+        db.session.add(event)
+        db.session.flush()
+        meal = MealOption(event_id=event.id, name=f"Meal {index}")
+        db.session.add(meal)
+        db.session.flush()
+        for i in range(count):
+            # One customer per order: a user holds one active booking per event
+            customer = User(name=f"Export Customer {index}-{i}", telephone=f"6012{index}{i:06d}")
+            db.session.add(customer)
+            db.session.flush()
+            db.session.add(Order(
+                user_id=customer.id,
+                event_id=event.id,
+                meal_option_id=meal.id,
+                amount=10.0,
+                admin_fee=1.0,
+                status=OrderStatus.PAID,
+                payment_method='stripe'
+            ))
+        events.append((event, count))
+    db.session.commit()
+    return admin, events
+
+def test_excel_export_route():
+    print("Testing Streaming Excel Export...")
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+        admin, events = seed_events()
+        client = logged_in(app, admin.id)
+
+        response = client.get('/admin/orders/export?event_id=all')
+        wb = load_workbook(BytesIO(response.data), read_only=True)
+
+        expected = [event.title for event, _ in sorted(events, key=lambda e: e[0].date, reverse=True)]
+        if wb.sheetnames != expected:
+            print(f"FAILURE: Expected sheets {expected}, got {wb.sheetnames}")
+            sys.exit(1)
+
+        for event, count in events:
+            rows = list(wb[event.title].iter_rows(values_only=True))
+            if len(rows) != count + 1 or any(row[4] != event.meal_options[0].name for row in rows[1:]):
+                print(f"FAILURE: Sheet '{event.title}' has unexpected rows.")
+                sys.exit(1)
+        print("SUCCESS: One sheet per event with the right orders.")
+
+        db.drop_all()
+
+def test_workbook_with_many_events():
+    print("Testing Excel Export Across Many Events...")
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+        seed_database(users=100, events=400, orders=1500, upcoming=10, rng=random.Random(3))
+        expected = export_rows_query(by_event=True).all()
+        paged = [row for batch in iter_export_batches(by_event=True, batch_size=97) for row in batch]
+        if [row.id for row in paged] != [row.id for row in expected]:
+            print("FAILURE: Paging by event skipped or repeated rows.")
+            sys.exit(1)
+
+        # Write-only sheets hold a temp file open until closed; far fewer
+        # descriptors than events must still be enough
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(200, hard), hard))
+        out = BytesIO()
+        try:
+            write_orders_workbook(out, export_rows_query(by_event=True).execution_options(yield_per=100))
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+        wb = load_workbook(out, read_only=True)
+        rows = sum(1 for name in wb.sheetnames for _ in wb[name].iter_rows(min_row=2))
+        if len(wb.sheetnames) != 400 or rows != len(expected):
+            print(f"FAILURE: Workbook has {len(wb.sheetnames)} sheets and {rows} rows.")
+            sys.exit(1)
+        print(f"SUCCESS: 400 event sheets and {rows} rows written under a 200 file descriptor limit.")
+
+        db.drop_all()
+
+def test_csv_export_route():
+    print("Testing Batched CSV Export...")
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+        admin, events = seed_events()
+        client = logged_in(app, admin.id)
+
+        event, count = events[1]
+        response = client.get(f'/admin/orders/export?event_id={event.id}')
+        chunks = list(response.response)
+        rows = list(csv.reader(b''.join(chunks).decode().splitlines()))
+
+        if len(rows) != count + 1 or rows[0][0] != 'Order ID':
+            print(f"FAILURE: Expected {count} data rows, got {len(rows) - 1}")
+            sys.exit(1)
+        if any(row[4] != event.title or row[5] != 'Meal 1' or row[8] != '11.0' for row in rows[1:]):
+            print("FAILURE: CSV rows missing joined event/meal columns.")
+            sys.exit(1)
+        if len(chunks) > 2:
+            print(f"FAILURE: Small export flushed in {len(chunks)} chunks.")
+            sys.exit(1)
+        print("SUCCESS: CSV export streams joined rows in buffered chunks.")
+
+        db.drop_all()
+
+def test_background_export_job():
+    print("Testing Background Export Job...")
+    workdir = tempfile.mkdtemp()
+
+    class JobConfig(VerifyConfig):
+        # File database: the worker thread opens its own connection
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'export.db')
+        EXPORT_FOLDER = os.path.join(workdir, 'exports')
+
+    app = create_app(JobConfig)
+    with app.app_context():
+        db.create_all()
+        admin, events = seed_events()
+        client = logged_in(app, admin.id)
+
+        event, count = events[1]
+        for event_id, file_format in ((event.id, 'csv'), ('all', 'xlsx')):
+            response = client.post('/admin/exports', data={'event_id': event_id})
+            status_url = response.headers['Location']
+            progress_url = status_url + '/progress'
+
+            deadline = time.time() + 10
+            progress = client.get(progress_url).get_json()
+            while progress['status'] in ('queued', 'running') and time.time() < deadline:
+                time.sleep(0.1)
+                progress = client.get(progress_url).get_json()
+
+            if progress['status'] != 'done':
+                print(f"FAILURE: {file_format} export ended as {progress['status']}: {progress['error']}")
+                sys.exit(1)
+
+            download = client.get(progress['download_url'])
+            if file_format == 'csv':
+                rows = list(csv.reader(download.get_data(as_text=True).splitlines()))
+                ok = len(rows) == count + 1 and progress['rows_written'] == count
+            else:
+                wb = load_workbook(BytesIO(download.data), read_only=True)
+                ok = len(wb.sheetnames) == len(events) and progress['rows_written'] == progress['total_rows']
+            download.close()
+            if not ok:
+                print(f"FAILURE: {file_format} export artifact is incomplete.")
+                sys.exit(1)
+            print(f"SUCCESS: Background {file_format} export finished with {progress['rows_written']} rows.")
+
+        db.drop_all()
+
+if __name__ == "__main__":
+    try:
+        test_excel_export_route()
+        test_workbook_with_many_events()
+        test_csv_export_route()
+        test_background_export_job()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,82 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, EventStatus
+from app.identity import identity_cache
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from verify_support import VerifyConfig, app_query_budget, logged_in
+import sys
+import time
+
+def user_selects(budget, client, url):
+    with budget() as recorder:
+        response = client.get(url)
+    return response, sum('FROM user' in statement for statement in recorder.statements)
+
+def test_identity_cache(query_budget):
+    print("Testing Cached User Identities...")
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+        admin = User(name="Identity Admin", telephone="0000000000", is_admin=True)
+        customer = User(name="Old Name", telephone="60170000001")
+        event = Event(title="Identity Lunch", date=datetime.now() + timedelta(days=3), fee=20.0,
+                      status=EventStatus.ACTIVE)
+        db.session.add_all([admin, customer, event])
+        db.session.flush()
+        db.session.add(MealOption(event_id=event.id, name="Standard"))
+        db.session.commit()
+        admin_id, customer_id = admin.id, customer.id
+    budget = query_budget(app)
+
+    client = logged_in(app, customer_id)
+    first, first_count = user_selects(budget, client, '/orders/')
+    second, second_count = user_selects(budget, client, '/orders/')
+    if first.status_code != 200 or first_count != 1 or second_count != 0:
+        print(f"FAILURE: User SELECTs per view were {first_count} then {second_count}.")
+        sys.exit(1)
+    print("SUCCESS: Warm logged-in page views skip the user SELECT.")
+
+    admin_client = logged_in(app, admin_id)
+    user_selects(budget, admin_client, '/admin/dashboard')
+    response, count = user_selects(budget, admin_client, '/admin/dashboard')
+    if response.status_code != 200 or count != 0:
+        print(f"FAILURE: Admin check returned {response.status_code} after {count} user SELECTs.")
+        sys.exit(1)
+    print("SUCCESS: admin_required is answered from the cached identity.")
+
+    client.post('/auth/profile', data={'name': 'New Name', 'email': 'new@example.com'})
+    page = client.get('/auth/profile').get_data(as_text=True)
+    with app.app_context():
+        cached = identity_cache().get(customer_id)
+        saved = db.session.get(User, customer_id)
+        saved_name, saved_email = saved.name, saved.email
+    if saved_name != 'New Name' or saved_email != 'new@example.com' or 'new@example.com' not in page:
+        print("FAILURE: Profile update did not persist.")
+        sys.exit(1)
+    if cached is None or cached.name != 'New Name':
+        print(f"FAILURE: Cached identity is stale after a profile update: {cached!r}.")
+        sys.exit(1)
+    print("SUCCESS: Profile updates invalidate the cached identity.")
+
+    # Demoted by another process: the snapshot may lag until it expires
+    with app.app_context():
+        db.session.get(User, admin_id).is_admin = False
+        db.session.commit()
+        ttl = app.config['USER_CACHE_TTL']
+    with patch('app.cache.time.monotonic', return_value=time.monotonic() + ttl + 1):
+        demoted = admin_client.get('/admin/dashboard')
+    if demoted.status_code == 302:
+        print("SUCCESS: Expired identities are reloaded, so role changes take effect.")
+    else:
+        print("FAILURE: Demoted admin still reached the dashboard after the TTL.")
+        sys.exit(1)
+
+    with app.app_context():
+        db.drop_all()
+
+if __name__ == "__main__":
+    try:
+        test_identity_cache(app_query_budget)
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,56 @@
+from app import create_app, db
+from app.models import Order, OrderStatus
+from verify_support import VerifyConfig
+import sys
+
+def query_plan(query):
+    sql = str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    with db.engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)]
+
+def test_order_query_plans():
+    print("Testing Order Query Plans...")
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+
+        # (description, query as the route builds it, index it must use)
+        hot_queries = [
+            ("My Orders",
+             Order.query.filter_by(user_id=1).order_by(Order.created_at.desc()),
+             'ix_order_user_id_created_at'),
+            ("Duplicate booking check",
+             Order.query.filter_by(user_id=1, event_id=1, status=OrderStatus.PAID),
+             'ix_order_user_id_event_id_status'),
+            ("Touch n Go queue",
+             Order.query.filter_by(status=OrderStatus.PROCESSING, payment_method='touchngo')
+             .order_by(Order.created_at.desc()),
+             'ix_order_status_payment_method_created_at'),
+            ("Admin report for one event",
+             Order.query.filter_by(event_id=1).order_by(Order.created_at.desc(), Order.id.desc()).limit(51),
+             'ix_order_event_id_created_at'),
+            ("Admin report for all events",
+             Order.query.order_by(Order.created_at.desc(), Order.id.desc()).limit(51),
+             'ix_order_created_at'),
+        ]
+
+        failed = False
+        for description, query, index in hot_queries:
+            plan = query_plan(query)
+            table_scan = any(step.startswith('SCAN') and 'INDEX' not in step for step in plan)
+            if table_scan or not any(index in step for step in plan):
+                print(f"FAILURE: {description} does not use {index}: {plan}")
+                failed = True
+            else:
+                print(f"SUCCESS: {description} uses {index}.")
+
+        db.drop_all()
+        if failed:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        test_order_query_plans()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,98 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, EventStatus
+from datetime import datetime, timedelta
+from verify_support import VerifyConfig, logged_in
+import sys
+
+class MetricsConfig(VerifyConfig):
+    METRICS_ENABLED = True
+    METRICS_TOKEN = 'scrape-me'
+
+def make_app(config_class):
+    app = create_app(config_class)
+    with app.app_context():
+        db.create_all()
+        admin = User(name="Metrics Admin", telephone="0000000000", is_admin=True)
+        customer = User(name="Metrics Diner", telephone="60180000001")
+        event = Event(title="Measured Dinner", date=datetime.now() + timedelta(days=5), fee=30.0,
+                      status=EventStatus.ACTIVE)
+        db.session.add_all([admin, customer, event])
+        db.session.flush()
+        db.session.add(MealOption(event_id=event.id, name="Standard"))
+        db.session.commit()
+        return app, admin.id, customer.id
+
+def test_metrics_disabled():
+    print("Testing Metrics Are Opt-in...")
+    app, admin_id, _ = make_app(VerifyConfig)
+    admin_client = logged_in(app, admin_id)
+    page = admin_client.get('/admin/metrics').get_data(as_text=True)
+    if 'metrics' in app.extensions or 'Instrumentation is off' not in page:
+        print("FAILURE: Metrics were recorded without METRICS_ENABLED.")
+        sys.exit(1)
+    if admin_client.get('/admin/metrics/prometheus').status_code != 404:
+        print("FAILURE: Prometheus endpoint served data while disabled.")
+        sys.exit(1)
+    print("SUCCESS: Nothing is instrumented unless METRICS_ENABLED is set.")
+
+def test_metrics_enabled():
+    print("Testing Request Metrics...")
+    app, admin_id, customer_id = make_app(MetricsConfig)
+    anonymous = app.test_client()
+    for _ in range(3):
+        anonymous.get('/events/')
+    anonymous.get('/no-such-page')
+    customer = logged_in(app, customer_id)
+    customer.get('/orders/')
+    customer.get('/orders/')
+
+    rows, _ = app.extensions['metrics'].snapshot()
+    stats = dict(rows)
+    listing, orders = stats.get('events.list_events'), stats.get('orders.list_orders')
+    if listing is None or orders is None or '<unmatched>' not in stats:
+        print(f"FAILURE: Endpoints recorded: {sorted(stats)}")
+        sys.exit(1)
+    if listing.requests != 3 or sum(listing.buckets) != 3 or listing.queries == 0 or orders.queries < 2:
+        print(f"FAILURE: Listing saw {listing.requests} requests / {listing.queries} queries, "
+              f"orders {orders.queries} queries.")
+        sys.exit(1)
+    print(f"SUCCESS: Latency and {listing.queries + orders.queries} queries attributed to their endpoints.")
+
+    if anonymous.get('/admin/metrics/prometheus').status_code != 403:
+        print("FAILURE: Prometheus metrics are public.")
+        sys.exit(1)
+    scrape = anonymous.get('/admin/metrics/prometheus', headers={'Authorization': 'Bearer scrape-me'})
+    text = scrape.get_data(as_text=True)
+    expected = [
+        '# TYPE catering_request_duration_seconds histogram',
+        'catering_request_duration_seconds_bucket{endpoint="events.list_events",blueprint="events",le="+Inf"} 3',
+        'catering_request_duration_seconds_count{endpoint="events.list_events",blueprint="events"} 3',
+        f'catering_db_queries_total{{endpoint="orders.list_orders"}} {orders.queries}',
+    ]
+    missing = [line for line in expected if line not in text]
+    if scrape.status_code != 200 or not scrape.mimetype == 'text/plain' or missing:
+        print(f"FAILURE: Prometheus output missing {missing}")
+        sys.exit(1)
+    print("SUCCESS: Token-authenticated scrape returns Prometheus text format.")
+
+    # Treat every statement as slow to exercise the slow-query log
+    app.extensions['metrics'].slow_query_seconds = 0
+    customer.get('/orders/')
+    app.extensions['metrics'].slow_query_seconds = 10
+    admin_client = logged_in(app, admin_id)
+    page = admin_client.get('/admin/metrics')
+    html = page.get_data(as_text=True)
+    slow = list(app.extensions['metrics'].slow_queries)
+    if not slow or slow[0]['endpoint'] != 'orders.list_orders' or page.status_code != 200 \
+            or 'events.list_events' not in html or 'SELECT' not in html:
+        print("FAILURE: Slow queries were not logged or shown.")
+        sys.exit(1)
+    print("SUCCESS: Admin metrics page lists endpoints and the slow-query log.")
+
+if __name__ == "__main__":
+    try:
+        test_metrics_disabled()
+        test_metrics_enabled()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
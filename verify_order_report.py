@@ -0,0 +1,145 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus
+from datetime import datetime
+from sqlalchemy import event as sa_event
+from verify_support import VerifyConfig, logged_in
+import sys
+
+class ReportConfig(VerifyConfig):
+    ADMIN_ORDERS_PER_PAGE = 20
+
+def add_orders(user, count):
+    event = Event(title=f"Report Event {count}", date=datetime.now(), fee=10.0, status=EventStatus.ACTIVE)
+    db.session.add(event)
+    db.session.flush()
+    meal = MealOption(event_id=event.id, name="Standard")
+    db.session.add(meal)
+    db.session.flush()
+    for i in range(count):
+        customer = User(name=f"Customer {count}-{i}", telephone=f"6{count:03d}{i:05d}")
+        db.session.add(customer)
+        db.session.flush()
+        db.session.add(Order(
+            user_id=customer.id,
+            event_id=event.id,
+            meal_option_id=meal.id,
+            amount=10.0,
+            status=OrderStatus.PAID,
+            payment_method='touchngo'
+        ))
+    db.session.commit()
+    return event
+
+def count_report_queries(app, client, event_id):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    sa_event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(f'/admin/orders?event_id={event_id}')
+    finally:
+        sa_event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    if response.status_code != 200:
+        print(f"FAILURE: Order report returned {response.status_code}")
+        sys.exit(1)
+    return len(statements)
+
+def test_order_report_query_count():
+    print("Testing Order Report Query Count...")
+    app = create_app(ReportConfig)
+    with app.app_context():
+        db.create_all()
+
+        admin = User(name="Report Admin", telephone="0000000000", is_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+
+        small = add_orders(admin, 5)
+        large = add_orders(admin, 50)
+
+        client = logged_in(app, admin.id)
+        small_count = count_report_queries(app, client, small.id)
+        large_count = count_report_queries(app, client, large.id)
+        all_count = count_report_queries(app, client, 'all')
+
+        if small_count == large_count == all_count:
+            print(f"SUCCESS: Order report uses {small_count} queries regardless of row count.")
+        else:
+            print(f"FAILURE: Query count grew with rows ({small_count} / {large_count} / {all_count}).")
+            sys.exit(1)
+
+        db.drop_all()
+
+def test_order_report_pagination():
+    print("Testing Order Report Pagination and Filters...")
+    app = create_app(ReportConfig)
+    with app.app_context():
+        db.create_all()
+
+        admin = User(name="Report Admin", telephone="0000000000", is_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+
+        event = add_orders(admin, 45)
+        # Identical timestamps force the id tie-breaker in the cursor
+        stamp = datetime(2026, 1, 15, 12, 0, 0)
+        for order in Order.query.all():
+            order.created_at = stamp
+        Order.query.filter(Order.id % 3 == 0).update({'status': OrderStatus.PENDING})
+        db.session.commit()
+
+        client = logged_in(app, admin.id)
+        seen = []
+        url = f'/admin/orders?event_id={event.id}'
+        while url:
+            response = client.get(url)
+            html = response.get_data(as_text=True)
+            page_ids = [int(chunk.split('<', 1)[0]) for chunk in html.split('<td>#')[1:]]
+            seen.extend(page_ids)
+            if len(page_ids) > ReportConfig.ADMIN_ORDERS_PER_PAGE:
+                print(f"FAILURE: Page returned {len(page_ids)} rows.")
+                sys.exit(1)
+            marker = 'cursor='
+            if marker in html:
+                cursor = html.split(marker, 1)[1].split('&', 1)[0].split('"', 1)[0]
+                url = f'/admin/orders?event_id={event.id}&cursor={cursor}'
+            else:
+                url = None
+
+        expected = [o.id for o in Order.query.order_by(Order.id.desc()).all()]
+        if seen == expected:
+            print(f"SUCCESS: Paged through {len(seen)} orders without gaps or repeats.")
+        else:
+            print("FAILURE: Keyset pages did not cover every order exactly once.")
+            sys.exit(1)
+
+        response = client.get('/admin/orders?status=pending&payment_method=touchngo'
+                              '&date_from=2026-01-15&date_to=2026-01-15')
+        html = response.get_data(as_text=True)
+        pending = html.count('<tr class="pending">')
+        if pending == 15 and '<tr class="paid">' not in html:
+            print("SUCCESS: Status, payment method and date filters applied.")
+        else:
+            print(f"FAILURE: Filtered report returned {pending} pending rows.")
+            sys.exit(1)
+
+        response = client.get('/admin/orders?date_from=2026-01-16')
+        if 'No orders found.' in response.get_data(as_text=True):
+            print("SUCCESS: Date range excludes older orders.")
+        else:
+            print("FAILURE: Date range filter let older orders through.")
+            sys.exit(1)
+
+        db.drop_all()
+
+if __name__ == "__main__":
+    try:
+        test_order_report_query_count()
+        test_order_report_pagination()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
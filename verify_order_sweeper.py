@@ -0,0 +1,126 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus
+from app.sweeper import expire_stale_orders
+from config import Config
+from datetime import datetime, timedelta
+import os
+import sys
+import tempfile
+import time
+
+STALE = 7
+
+def make_config(interval=0):
+    workdir = tempfile.mkdtemp()
+
+    class VerifyConfig(Config):
+        # File database so the sweeper thread gets its own connection
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'sweeper.db')
+        ORDER_SWEEP_BATCH_SIZE = 3
+        ORDER_SWEEP_INTERVAL = interval
+    return VerifyConfig
+
+def seed_orders():
+    """Stale and fresh orders in every state; returns (event id, {label: order id})"""
+    event = Event(title="Sweeper Supper", date=datetime.now() + timedelta(days=3), fee=20.0,
+                  capacity=20, status=EventStatus.ACTIVE)
+    db.session.add(event)
+    db.session.flush()
+    meal = MealOption(event_id=event.id, name="Standard")
+    db.session.add(meal)
+    db.session.flush()
+
+    two_hours_ago = datetime.utcnow() - timedelta(hours=2)
+    specs = [(f'stale_{i}', OrderStatus.PENDING, 'stripe', two_hours_ago) for i in range(STALE)] + [
+        ('fresh', OrderStatus.PENDING, 'stripe', datetime.utcnow()),
+        ('retried', OrderStatus.PENDING, 'stripe', two_hours_ago),
+        ('paid', OrderStatus.PAID, 'stripe', two_hours_ago),
+        ('touchngo', OrderStatus.PROCESSING, 'touchngo', two_hours_ago),
+    ]
+    orders = {}
+    for i, (label, status, method, created_at) in enumerate(specs):
+        customer = User(name=f"Sweep {label}", telephone=f"6013000{i:04d}")
+        db.session.add(customer)
+        db.session.flush()
+        orders[label] = Order(user_id=customer.id, event_id=event.id, meal_option_id=meal.id, amount=20.0,
+                              status=status, payment_method=method, created_at=created_at)
+        db.session.add(orders[label])
+    # Placed long ago, but the customer just started a new Checkout Session
+    orders['retried'].checkout_started_at = datetime.utcnow()
+    db.session.commit()
+    return event.id, {label: order.id for label, order in orders.items()}
+
+def statuses(order_ids):
+    return {label: db.session.get(Order, order_id).status for label, order_id in order_ids.items()}
+
+def test_expire_stale_orders():
+    print("Testing Pending Order Sweeper...")
+    app = create_app(make_config())
+    with app.app_context():
+        db.create_all()
+        event_id, order_ids = seed_orders()
+        if db.session.get(Event, event_id).seats_taken != STALE + 4:
+            print("FAILURE: Seed did not take the expected seats.")
+            sys.exit(1)
+
+        result = expire_stale_orders()
+        db.session.expire_all()
+        after = statuses(order_ids)
+        stale = [after[f'stale_{i}'] for i in range(STALE)]
+        if result.expired != STALE or result.batches != 3 or any(s != OrderStatus.FAILED for s in stale):
+            print(f"FAILURE: Sweep reported {result.as_dict()} with stale orders {stale}.")
+            sys.exit(1)
+        print(f"SUCCESS: Expired {result.expired} stale orders in {result.batches} batches.")
+
+        kept = (after['fresh'], after['retried'], after['paid'], after['touchngo'])
+        if kept != (OrderStatus.PENDING, OrderStatus.PENDING, OrderStatus.PAID, OrderStatus.PROCESSING):
+            print(f"FAILURE: Sweep touched orders it should keep: {kept}")
+            sys.exit(1)
+        print("SUCCESS: Fresh, recently retried, paid and Touch n Go orders are left alone.")
+
+        if db.session.get(Event, event_id).seats_taken == 4:
+            print("SUCCESS: Expired orders gave their seats back.")
+        else:
+            print("FAILURE: Seat counter not refreshed after the sweep.")
+            sys.exit(1)
+
+    runner = app.test_cli_runner()
+    output = runner.invoke(args=['expire-orders', '--max-age', '60']).output
+    if 'Expired 0 orders' in output:
+        print("SUCCESS: flask expire-orders reports an idempotent second run.")
+    else:
+        print(f"FAILURE: Unexpected CLI output: {output!r}")
+        sys.exit(1)
+
+    output = runner.invoke(args=['expire-orders', '--max-age', '0']).output
+    if 'Expired 2 orders' in output:
+        print("SUCCESS: --max-age 0 expires every pending card order.")
+    else:
+        print(f"FAILURE: --max-age 0 gave {output!r}")
+        sys.exit(1)
+
+def test_background_sweeper():
+    print("Testing Background Sweeper Thread...")
+    app = create_app(make_config(interval=0.2))
+    with app.app_context():
+        db.create_all()
+        _, order_ids = seed_orders()
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and app.extensions['order_sweeper']['expired'] < STALE:
+        time.sleep(0.1)
+    with app.app_context():
+        after = statuses(order_ids)
+    if app.extensions['order_sweeper']['expired'] == STALE and after['stale_0'] == OrderStatus.FAILED:
+        print(f"SUCCESS: Background sweeper reclaimed {STALE} orders ({app.extensions['order_sweeper']['runs']} runs).")
+    else:
+        print(f"FAILURE: Background sweeper stats {app.extensions['order_sweeper']}.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        test_expire_stale_orders()
+        test_background_sweeper()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,128 @@
+from app import create_app, db
+from app.gateway import StripeGateway, GatewayUnavailable
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from stripe_standin import LocalStripe
+from verify_support import VerifyConfig, logged_in
+import stripe
+import sys
+import time
+
+class GatewayConfig(VerifyConfig):
+    STRIPE_SECRET_KEY = 'sk_test_standin'
+    STRIPE_READ_TIMEOUT = 0.3
+    STRIPE_MAX_RETRIES = 2
+    STRIPE_RETRY_BACKOFF = 0.01
+    STRIPE_BREAKER_THRESHOLD = 2
+    STRIPE_BREAKER_RESET = 60
+
+def make_app(api_base):
+    app = create_app(GatewayConfig)
+    app.config['STRIPE_API_BASE'] = api_base
+    with app.app_context():
+        db.create_all()
+        event = Event(title="Gateway Dinner", date=datetime.now() + timedelta(days=5), fee=40.0,
+                      status=EventStatus.ACTIVE)
+        customer = User(name="Gateway Customer", telephone="60124000001")
+        db.session.add_all([event, customer])
+        db.session.flush()
+        meal = MealOption(event_id=event.id, name="Standard")
+        db.session.add(meal)
+        db.session.commit()
+        url = f'/payment/stripe/{event.id}/{meal.id}'
+        customer_id = customer.id
+    client = logged_in(app, customer_id)
+    return app, client, url
+
+def latest_order(app):
+    with app.app_context():
+        return Order.query.order_by(Order.id.desc()).first().status
+
+def test_retries_and_timeouts():
+    print("Testing Stripe Retries and Timeouts...")
+    with LocalStripe('whsec_verify') as gateway:
+        app, client, url = make_app(gateway.api_base)
+
+        gateway.fail_next = 2
+        response = client.get(url)
+        if response.status_code != 303 or gateway.calls != 3 or len(gateway.sessions) != 1 \
+                or len(set(gateway.idempotency_keys)) != 1:
+            print(f"FAILURE: Expected 2 retries then one session, got {gateway.calls} calls.")
+            sys.exit(1)
+        print("SUCCESS: Transient 500s are retried with one idempotency key.")
+        if stripe.api_key is not None:
+            print("FAILURE: Checkout set the global stripe.api_key.")
+            sys.exit(1)
+        print("SUCCESS: The API key stays on the gateway client, not the stripe module.")
+
+        with app.app_context():
+            order = Order.query.one()
+            order.status = OrderStatus.FAILED
+            db.session.commit()
+        gateway.delay = 1.0
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - started
+        gateway.delay = 0.0
+        # Three attempts at a 0.3s read timeout, well short of the 1s stall each
+        if response.status_code != 302 or '/payment/checkout' not in response.headers['Location'] \
+                or latest_order(app) != OrderStatus.FAILED or elapsed > 2.0:
+            print(f"FAILURE: Slow Stripe held the request for {elapsed:.2f}s.")
+            sys.exit(1)
+        print(f"SUCCESS: A stalled gateway fails the checkout after {elapsed:.2f}s and frees the seat.")
+
+def test_circuit_breaker():
+    print("Testing Stripe Circuit Breaker...")
+    with LocalStripe('whsec_verify') as gateway:
+        app, client, url = make_app(gateway.api_base)
+        gateway.fail_next = 100
+        client.get(url)
+        client.get(url)
+        calls = gateway.calls
+        response = client.get(url)
+        if gateway.calls != calls or latest_order(app) != OrderStatus.FAILED or response.status_code != 302:
+            print(f"FAILURE: Open breaker still called Stripe ({gateway.calls - calls} calls).")
+            sys.exit(1)
+        print("SUCCESS: After repeated outages checkout fails fast without calling Stripe.")
+
+        with app.app_context():
+            breaker = app.extensions['payment_gateway'].breaker
+        breaker.opened_at -= GatewayConfig.STRIPE_BREAKER_RESET
+        gateway.fail_next = 0
+        if client.get(url).status_code == 303 and breaker.state == 'closed':
+            print("SUCCESS: A successful trial call closes the breaker.")
+        else:
+            print("FAILURE: Breaker did not recover after the reset period.")
+            sys.exit(1)
+
+def test_concurrency_limit():
+    print("Testing Stripe Concurrency Limit...")
+    with LocalStripe('whsec_verify') as gateway:
+        client = StripeGateway('sk_test_standin', api_base=gateway.api_base, timeout=(1, 2),
+                               max_concurrent=1, queue_timeout=0.05)
+        gateway.delay = 0.5
+
+        def create(_):
+            try:
+                client.create_checkout_session({'mode': 'payment'})
+                return 'created'
+            except GatewayUnavailable:
+                return 'shed'
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(create, range(3)))
+        if results.count('created') == 1 and results.count('shed') == 2:
+            print("SUCCESS: Calls beyond the limit are shed instead of queueing behind a slow gateway.")
+        else:
+            print(f"FAILURE: Unexpected results {results}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        test_retries_and_timeouts()
+        test_circuit_breaker()
+        test_concurrency_limit()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,117 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus
+from app.querybudget import QueryBudgetExceeded, query_budget
+from datetime import datetime, timedelta
+from verify_support import VerifyConfig, logged_in
+import logging
+import sys
+
+EVENTS = 12
+
+class GuardConfig(VerifyConfig):
+    LAZY_LOAD_THRESHOLD = 3
+
+class RaiseConfig(GuardConfig):
+    LAZY_LOAD_GUARD = 'raise'
+
+class WarnConfig(GuardConfig):
+    LAZY_LOAD_GUARD = 'warn'
+
+def make_app(config_class):
+    app = create_app(config_class)
+
+    # Deliberately naive view: one lazy load of Order.event per row
+    @app.route('/naive-orders')
+    def naive_orders():
+        return ','.join(order.event.title for order in Order.query.all())
+
+    with app.app_context():
+        db.create_all()
+        admin = User(name="Budget Admin", telephone="0000000000", is_admin=True)
+        customer = User(name="Budget Diner", telephone="60190000001")
+        events = [Event(title=f"Budget Event {i}", date=datetime.now() + timedelta(days=i + 1), fee=10.0,
+                        status=EventStatus.ACTIVE) for i in range(EVENTS)]
+        db.session.add_all([admin, customer] + events)
+        db.session.flush()
+        meals = [MealOption(event_id=event.id, name="Standard") for event in events]
+        db.session.add_all(meals)
+        db.session.flush()
+        db.session.add_all([Order(user_id=customer.id, event_id=meal.event_id, meal_option_id=meal.id,
+                                  amount=10.0, status=OrderStatus.PAID, payment_method='touchngo')
+                            for meal in meals])
+        db.session.commit()
+        return app, admin.id, customer.id
+
+def collect_log(app):
+    messages = []
+    handler = logging.Handler()
+    handler.emit = lambda record: messages.append(record.getMessage() + str(record.exc_info and record.exc_info[1]))
+    app.logger.addHandler(handler)
+    return messages
+
+def test_route_budgets():
+    print("Testing Route Query Budgets...")
+    app, admin_id, customer_id = make_app(GuardConfig)
+    customer = logged_in(app, customer_id)
+    admin = logged_in(app, admin_id)
+    customer.get('/orders/')
+    admin.get('/admin/dashboard')  # warm the identity cache
+
+    budgets = [
+        (customer, '/orders/', 1),
+        (admin, '/admin/orders?event_id=all', 2),
+        (admin, '/admin/dashboard', 4),
+    ]
+    for client, url, max_queries in budgets:
+        with query_budget(app, max_queries=max_queries, max_lazy_loads=0) as recorder:
+            response = client.get(url)
+        if response.status_code != 200:
+            print(f"FAILURE: {url} returned {response.status_code}.")
+            sys.exit(1)
+        print(f"SUCCESS: {url} listed {EVENTS} orders/events in {recorder.count} queries, no lazy loads.")
+
+    try:
+        with query_budget(app, max_lazy_loads=1):
+            app.test_client().get('/naive-orders')
+    except QueryBudgetExceeded as e:
+        if 'Order.event lazily loaded' not in str(e):
+            print(f"FAILURE: Unexpected budget report: {e}")
+            sys.exit(1)
+    else:
+        print("FAILURE: An N+1 view stayed within a lazy-load budget of 1.")
+        sys.exit(1)
+    print("SUCCESS: query_budget reports the relationship behind an N+1.")
+
+def test_lazy_load_guard():
+    print("Testing Lazy Load Guard...")
+    raise_app, _, _ = make_app(RaiseConfig)
+    errors = collect_log(raise_app)
+    response = raise_app.test_client().get('/naive-orders')
+    if response.status_code == 500 and any('Order.event was lazily loaded more than 3 times' in m for m in errors):
+        print("SUCCESS: Raise mode fails the request with NPlusOneError.")
+    else:
+        print(f"FAILURE: Raise mode returned {response.status_code}.")
+        sys.exit(1)
+
+    warn_app, _, _ = make_app(WarnConfig)
+    messages = collect_log(warn_app)
+    response = warn_app.test_client().get('/naive-orders')
+    warnings = [m for m in messages if 'Possible N+1: Order.event' in m]
+    if response.status_code != 200 or len(warnings) != 1:
+        print(f"FAILURE: Warn mode logged {warnings}.")
+        sys.exit(1)
+    print("SUCCESS: Warn mode logs each offending relationship once per request.")
+
+    off_app, _, _ = make_app(GuardConfig)
+    if 'lazy_load_guard' in off_app.extensions or off_app.test_client().get('/naive-orders').status_code != 200:
+        print("FAILURE: Guard is active outside debug mode.")
+        sys.exit(1)
+    print("SUCCESS: Guard stays off in production unless configured.")
+
+if __name__ == "__main__":
+    try:
+        test_route_budgets()
+        test_lazy_load_guard()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,179 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus, ScreenshotStatus
+from app.screenshots import incoming_path, thumbnail_name
+from config import Config
+from datetime import datetime, timedelta
+from io import BytesIO
+from PIL import Image
+from verify_support import logged_in
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+def make_app():
+    workdir = tempfile.mkdtemp()
+
+    class VerifyConfig(Config):
+        # File database so the pipeline thread gets its own connection
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'screenshots.db')
+        UPLOAD_FOLDER = os.path.join(workdir, 'public')
+        UPLOAD_INCOMING_FOLDER = os.path.join(workdir, 'incoming')
+
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+        event = Event(title="Screenshot Social", date=datetime.now() + timedelta(days=4), fee=15.0,
+                      status=EventStatus.ACTIVE)
+        db.session.add(event)
+        db.session.flush()
+        meal = MealOption(event_id=event.id, name="Standard")
+        db.session.add(meal)
+        users = [User(name=f"Uploader {i}", telephone=f"6014000000{i}") for i in range(3)]
+        db.session.add_all(users)
+        db.session.commit()
+        return app, event.id, meal.id, [u.id for u in users]
+
+def phone_photo():
+    """A large JPEG like a phone camera's: EXIF camera make and rotate-90 orientation"""
+    exif = Image.Exif()
+    exif[0x010F] = 'SnoopCam'  # Make
+    exif[0x0112] = 6  # Orientation: rotate 90 CW for display
+    out = BytesIO()
+    Image.new('RGB', (3000, 2000), (30, 120, 200)).save(out, 'JPEG', quality=95, exif=exif.tobytes())
+    return out.getvalue()
+
+def upload(app, user_id, event_id, meal_id, data, filename):
+    client = logged_in(app, user_id)
+    return client.post('/payment/checkout', data={
+        'event_id': event_id,
+        'meal_id': meal_id,
+        'payment_method': 'touchngo',
+        'payment_screenshot': (BytesIO(data), filename),
+    }, content_type='multipart/form-data')
+
+def wait_for_screenshot(app, user_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        with app.app_context():
+            order = Order.query.filter_by(user_id=user_id).one()
+            if order.screenshot_status != ScreenshotStatus.PENDING or time.monotonic() > deadline:
+                return order
+        time.sleep(0.05)
+
+def test_screenshot_pipeline():
+    print("Testing Touch n Go Screenshot Pipeline...")
+    app, event_id, meal_id, (photo_user, junk_user, _) = make_app()
+    folder = app.config['UPLOAD_FOLDER']
+
+    response = upload(app, photo_user, event_id, meal_id, phone_photo(), 'proof.jpg')
+    if response.status_code != 302 or '/touchngo/confirmation/' not in response.headers['Location']:
+        print(f"FAILURE: Upload returned {response.status_code}.")
+        sys.exit(1)
+    order = wait_for_screenshot(app, photo_user)
+    if order.screenshot_status != ScreenshotStatus.READY or order.status != OrderStatus.PROCESSING:
+        print(f"FAILURE: Screenshot ended {order.screenshot_status}.")
+        sys.exit(1)
+
+    path = os.path.join(folder, order.payment_screenshot)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with Image.open(path) as image, Image.open(os.path.join(folder, thumbnail_name(order.payment_screenshot))) as thumb:
+        checks = {
+            'webp': image.format == 'WEBP' and thumb.format == 'WEBP',
+            'rotated and downscaled': image.size == (1067, 1600),
+            'thumbnail': max(thumb.size) == app.config['SCREENSHOT_THUMB_SIZE'],
+            'metadata stripped': not image.getexif() and 'exif' not in image.info,
+            'content hashed name': hashlib.sha256(data).hexdigest()[:16] in order.payment_screenshot,
+            'raw upload removed': not os.listdir(app.config['UPLOAD_INCOMING_FOLDER']),
+        }
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"FAILURE: Processed screenshot failed checks: {failed}")
+        sys.exit(1)
+    print(f"SUCCESS: 3000x2000 JPEG became a {len(data) // 1024} KB upright WebP without EXIF, plus a thumbnail.")
+
+    upload(app, junk_user, event_id, meal_id, b'definitely not an image', 'proof.png')
+    order = wait_for_screenshot(app, junk_user)
+    if order.screenshot_status == ScreenshotStatus.INVALID and order.payment_screenshot is None:
+        print("SUCCESS: A file that is not an image is flagged invalid and never published.")
+    else:
+        print(f"FAILURE: Junk upload ended {order.screenshot_status} as {order.payment_screenshot}.")
+        sys.exit(1)
+
+def test_admin_thumbnails():
+    print("Testing Touch n Go Thumbnail Grid...")
+    app, event_id, meal_id, (customer_id, legacy_id, _) = make_app()
+    upload(app, customer_id, event_id, meal_id, phone_photo(), 'proof.jpg')
+    order = wait_for_screenshot(app, customer_id)
+    with app.app_context():
+        # A screenshot saved before the pipeline existed: no thumbnail
+        with open(os.path.join(app.config['UPLOAD_FOLDER'], 'legacy_20250101.jpg'), 'wb') as f:
+            f.write(phone_photo())
+        db.session.add(Order(user_id=legacy_id, event_id=event_id, meal_option_id=meal_id, amount=15.0,
+                             status=OrderStatus.PROCESSING, payment_method='touchngo',
+                             payment_screenshot='legacy_20250101.jpg', screenshot_status=ScreenshotStatus.READY))
+        admin = User(name="Thumb Admin", telephone="0000000000", is_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+        admin_id = admin.id
+
+    admin_client = logged_in(app, admin_id)
+    page = admin_client.get('/admin/touchngo/verify').get_data(as_text=True)
+    thumb_url = f'/admin/screenshots/{order.payment_screenshot}?size=thumb'
+    full_url = f'/admin/screenshots/{order.payment_screenshot}'
+    if f'src="{thumb_url}"' not in page or f'data-full="{full_url}"' not in page or 'loading="lazy"' not in page:
+        print("FAILURE: Verification page does not show lazy thumbnails.")
+        sys.exit(1)
+    print("SUCCESS: Verification grid loads thumbnails and defers full images.")
+
+    thumb = admin_client.get(thumb_url)
+    full = admin_client.get(full_url)
+    cache = thumb.headers.get('Cache-Control', '')
+    if thumb.status_code != 200 or len(thumb.data) >= len(full.data) \
+            or 'max-age=31536000' not in cache or 'immutable' not in cache or 'private' not in cache:
+        print(f"FAILURE: Thumbnail served {len(thumb.data)} bytes with Cache-Control {cache!r}.")
+        sys.exit(1)
+    print(f"SUCCESS: Thumbnail is {len(thumb.data)} bytes vs {len(full.data)} for the full image, cached for a year.")
+
+    legacy = admin_client.get('/admin/screenshots/legacy_20250101.jpg?size=thumb')
+    anonymous = app.test_client().get(thumb_url)
+    if legacy.status_code == 200 and legacy.mimetype == 'image/jpeg' and anonymous.status_code == 302:
+        print("SUCCESS: Legacy uploads fall back to the full image; screenshots need an admin.")
+    else:
+        print(f"FAILURE: Legacy returned {legacy.status_code}, anonymous {anonymous.status_code}.")
+        sys.exit(1)
+
+def test_reprocess_command():
+    print("Testing flask process-screenshots...")
+    app, event_id, meal_id, (user_id, _, _) = make_app()
+    with app.app_context():
+        # As if the process died after the upload was written but before processing
+        order = Order(user_id=user_id, event_id=event_id, meal_option_id=meal_id, amount=15.0,
+                      status=OrderStatus.PROCESSING, payment_method='touchngo',
+                      screenshot_status=ScreenshotStatus.PENDING)
+        db.session.add(order)
+        db.session.commit()
+        os.makedirs(app.config['UPLOAD_INCOMING_FOLDER'], exist_ok=True)
+        with open(incoming_path(app, order.id), 'wb') as f:
+            f.write(phone_photo())
+        order_id = order.id
+
+    output = app.test_cli_runner().invoke(args=['process-screenshots']).output
+    with app.app_context():
+        status = db.session.get(Order, order_id).screenshot_status
+    if 'Processed 1 pending screenshots' in output and status == ScreenshotStatus.READY:
+        print("SUCCESS: Interrupted uploads are recovered from the incoming folder.")
+    else:
+        print(f"FAILURE: Recovery left the screenshot {status}: {output!r}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        test_screenshot_pipeline()
+        test_admin_thumbnails()
+        test_reprocess_command()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
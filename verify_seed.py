@@ -0,0 +1,95 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, Order, OrderStatus
+from app.seed import seed_database
+from app.stats import SEAT_STATUSES, event_summaries
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import func, select
+from verify_support import VerifyConfig
+import random
+import sys
+
+def seeded_app(random_seed):
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+        seed_database(users=300, events=40, orders=3000, upcoming=6, rng=random.Random(random_seed))
+    return app
+
+def order_fingerprint(app):
+    with app.app_context():
+        return db.session.execute(
+            select(Order.user_id, Order.event_id, Order.meal_option_id, Order.status, Order.payment_method)
+            .order_by(Order.id)
+        ).all()
+
+def test_seed_dataset():
+    print("Testing Synthetic Data Generator...")
+    app = seeded_app(7)
+    with app.app_context():
+        counts = {model.__name__: db.session.scalar(select(func.count(model.id)))
+                  for model in (User, Event, MealOption, Order)}
+        if counts['User'] != 300 or counts['Event'] != 40 or counts['MealOption'] < 40 or counts['Order'] < 2500:
+            print(f"FAILURE: Unexpected volumes {counts}")
+            sys.exit(1)
+
+        orders = db.session.execute(
+            select(Order.user_id, Order.event_id, Order.status, Order.payment_method, Event.date, MealOption.event_id)
+            .join(Event, Event.id == Order.event_id).join(MealOption, MealOption.id == Order.meal_option_id)
+        ).all()
+        active = Counter((user_id, event_id) for user_id, event_id, status, *_ in orders if status in SEAT_STATUSES)
+        now = datetime.utcnow()
+        problems = {
+            'duplicate active bookings': any(count > 1 for count in active.values()),
+            'meal from another event': any(event_id != meal_event_id for _, event_id, *_, meal_event_id in orders),
+            'unpaid orders on past events': any(status in (OrderStatus.PENDING, OrderStatus.PROCESSING) and date < now
+                                                for _, _, status, _, date, _ in orders),
+        }
+        methods = Counter(method for _, _, _, method, _, _ in orders)
+        statuses = Counter(status for _, _, status, _, _, _ in orders)
+        problems['payment method mix'] = not 0.5 < methods['touchngo'] / len(orders) < 0.75
+        problems['mostly paid'] = not statuses[OrderStatus.PAID] / len(orders) > 0.7
+
+        summaries = event_summaries()
+        for event in Event.query.all():
+            taken = sum(1 for _, event_id, status, *_ in orders if event_id == event.id and status in SEAT_STATUSES)
+            if event.seats_taken != taken or summaries[event.id].seats_taken != taken:
+                problems['stats rebuilt'] = True
+            if event.capacity is not None and taken > event.capacity:
+                problems['within capacity'] = True
+    failed = [name for name, bad in problems.items() if bad]
+    if failed:
+        print(f"FAILURE: Seeded data failed checks: {failed}")
+        sys.exit(1)
+    print(f"SUCCESS: Seeded {counts} with consistent bookings, seats and stats.")
+
+    if order_fingerprint(seeded_app(7)) != order_fingerprint(app):
+        print("FAILURE: The same --seed produced different orders.")
+        sys.exit(1)
+    print("SUCCESS: A fixed seed reproduces the same dataset.")
+
+def test_seed_command():
+    print("Testing flask seed...")
+    app = create_app(VerifyConfig)
+    with app.app_context():
+        db.create_all()
+    runner = app.test_cli_runner()
+    first = runner.invoke(args=['seed', '--users', '50', '--events', '5', '--orders', '200', '--seed', '1'])
+    refused = runner.invoke(args=['seed', '--users', '5', '--events', '1', '--orders', '5'], input='n\n')
+    again = runner.invoke(args=['seed', '--users', '50', '--events', '5', '--orders', '200', '--yes'])
+    with app.app_context():
+        users = db.session.scalar(select(func.count(User.id)))
+        events = db.session.scalar(select(func.count(Event.id)))
+    if 'Seeded 50 users, 5 events' not in first.output or refused.exit_code == 0 or again.exit_code != 0 \
+            or users != 100 or events != 10:
+        print(f"FAILURE: CLI runs gave {first.output!r}, {refused.output!r}, {again.output!r}")
+        sys.exit(1)
+    print("SUCCESS: flask seed asks before adding to existing data and can be rerun.")
+
+if __name__ == "__main__":
+    try:
+        test_seed_dataset()
+        test_seed_command()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
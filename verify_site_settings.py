@@ -0,0 +1,74 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, EventStatus
+from app.settings import get_site_settings
+from config import Config
+from datetime import datetime, timedelta
+from verify_support import app_query_budget, logged_in
+import os
+import sys
+import tempfile
+
+def settings_queries(budget, client, url):
+    with budget() as recorder:
+        response = client.get(url)
+    return response, sum('site_setting' in statement for statement in recorder.statements)
+
+def transfer_phone(app):
+    with app.app_context():
+        return get_site_settings().transfer_phone
+
+def test_site_settings_cache(query_budget):
+    print("Testing Cached Site Settings...")
+    workdir = tempfile.mkdtemp()
+
+    class VerifyConfig(Config):
+        # File database and stamp shared by two app instances, like two workers
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'settings.db')
+        SETTINGS_STAMP_FILE = os.path.join(workdir, 'site_settings.stamp')
+
+    worker_a = create_app(VerifyConfig)
+    worker_b = create_app(VerifyConfig)
+    with worker_a.app_context():
+        db.create_all()
+        admin = User(name="Settings Admin", telephone="0000000000", is_admin=True)
+        customer = User(name="Settings Customer", telephone="60122222222")
+        event = Event(title="Settings Dinner", date=datetime.now() + timedelta(days=2), fee=15.0,
+                      status=EventStatus.ACTIVE)
+        db.session.add_all([admin, customer, event])
+        db.session.flush()
+        meal = MealOption(event_id=event.id, name="Standard")
+        db.session.add(meal)
+        db.session.commit()
+        admin_id, customer_id = admin.id, customer.id
+        checkout_url = f'/payment/checkout?event_id={event.id}&meal_id={meal.id}'
+    budget_b = query_budget(worker_b)
+
+    admin_a = logged_in(worker_a, admin_id)
+    admin_a.get('/admin/dashboard')
+    admin_a.post('/admin/settings/transfer-phone', data={'transfer_phone': '0111111111'})
+
+    customer_b = logged_in(worker_b, customer_id)
+    first, _ = settings_queries(budget_b, customer_b, checkout_url)
+    second, queries = settings_queries(budget_b, customer_b, checkout_url)
+    if second.status_code != 200 or queries or transfer_phone(worker_b) != '0111111111':
+        print(f"FAILURE: Warm checkout ran {queries} settings queries.")
+        sys.exit(1)
+    print("SUCCESS: Warm checkout reads settings without a query.")
+
+    admin_a.post('/admin/settings/transfer-phone', data={'transfer_phone': '0122222222'})
+    third, queries = settings_queries(budget_b, customer_b, checkout_url)
+    if queries == 1 and transfer_phone(worker_b) == '0122222222':
+        print("SUCCESS: Other worker reloads settings once after the stamp changes.")
+    else:
+        print("FAILURE: Other worker served stale settings.")
+        sys.exit(1)
+
+    with worker_a.app_context():
+        db.drop_all()
+
+if __name__ == "__main__":
+    try:
+        test_site_settings_cache(app_query_budget)
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
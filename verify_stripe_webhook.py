@@ -0,0 +1,108 @@
+from app import create_app, db
+from app.models import User, Event, MealOption, Order, OrderStatus, EventStatus, StripeEvent
+from datetime import datetime, timedelta
+from stripe_standin import LocalStripe
+from verify_support import VerifyConfig, logged_in
+import sys
+
+WEBHOOK_SECRET = 'whsec_verify'
+
+class WebhookConfig(VerifyConfig):
+    STRIPE_SECRET_KEY = 'sk_test_standin'
+    STRIPE_WEBHOOK_SECRET = WEBHOOK_SECRET
+
+def order_state(app, order_id):
+    with app.app_context():
+        order = db.session.get(Order, order_id)
+        return order.status, order.payment_reference, order.event.seats_taken
+
+def test_stripe_webhook():
+    print("Testing Stripe Webhook Confirmation...")
+    app = create_app(WebhookConfig)
+    with app.app_context():
+        db.create_all()
+        event = Event(title="Webhook Gala", date=datetime.now() + timedelta(days=5), fee=40.0,
+                      capacity=10, status=EventStatus.ACTIVE)
+        payer = User(name="Card Payer", telephone="60123000001")
+        quitter = User(name="Card Quitter", telephone="60123000002")
+        db.session.add_all([event, payer, quitter])
+        db.session.flush()
+        meal = MealOption(event_id=event.id, name="Standard")
+        db.session.add(meal)
+        db.session.commit()
+        checkout_url = f'/payment/stripe/{event.id}/{meal.id}'
+        payer_id, quitter_id = payer.id, quitter.id
+
+    clients = {}
+    for user_id in (payer_id, quitter_id):
+        clients[user_id] = logged_in(app, user_id)
+    stripe_hook = app.test_client()
+
+    with LocalStripe(WEBHOOK_SECRET) as gateway:
+        app.config['STRIPE_API_BASE'] = gateway.api_base
+        clients[payer_id].get(checkout_url)
+        clients[quitter_id].get(checkout_url)
+        # The quitter goes Back and starts over: the order is reused with a
+        # new session, so the first session's expiry and Back button are stale
+        clients[quitter_id].get(checkout_url)
+    paid_session, expired_session, retry_session = gateway.sessions
+    paid_id = int(paid_session['metadata']['order_id'])
+    expired_id = int(expired_session['metadata']['order_id'])
+
+    # Reaching the success URL is not proof of payment
+    page = clients[payer_id].get(f'/payment/stripe/success/{paid_id}', follow_redirects=True)
+    if order_state(app, paid_id)[0] != OrderStatus.PENDING or 'Confirming Payment' not in page.get_data(as_text=True):
+        print("FAILURE: Success redirect changed the order without a webhook.")
+        sys.exit(1)
+    print("SUCCESS: Success URL leaves the order pending until Stripe confirms.")
+
+    completed = gateway.completed(paid_session)
+    forged = gateway.deliver(stripe_hook, completed, secret='whsec_forged')
+    if forged.status_code != 400 or order_state(app, paid_id)[0] != OrderStatus.PENDING:
+        print(f"FAILURE: Forged webhook returned {forged.status_code} and changed the order.")
+        sys.exit(1)
+    print("SUCCESS: Webhooks with a bad signature are rejected.")
+
+    first = gateway.deliver(stripe_hook, completed)
+    status, reference, _ = order_state(app, paid_id)
+    if first.status_code != 200 or status != OrderStatus.PAID or reference != completed['data']['object']['payment_intent']:
+        print(f"FAILURE: Completed session left order {status} ({first.status_code}).")
+        sys.exit(1)
+    print("SUCCESS: checkout.session.completed marks the order paid.")
+
+    # Redelivery and a stale expiry for the same order must change nothing
+    replay = gateway.deliver(stripe_hook, completed)
+    late_expiry = gateway.deliver(stripe_hook, gateway.expired(paid_session))
+    with app.app_context():
+        recorded = StripeEvent.query.filter_by(id=completed['id']).count()
+    if replay.status_code != 200 or late_expiry.status_code != 200 or recorded != 1 \
+            or order_state(app, paid_id)[:2] != (OrderStatus.PAID, reference):
+        print("FAILURE: Replayed or late events changed a paid order.")
+        sys.exit(1)
+    print("SUCCESS: Duplicate and out-of-order events are ignored.")
+
+    gateway.deliver(stripe_hook, gateway.expired(expired_session))
+    clients[quitter_id].get(expired_session['cancel_url'].replace('http://localhost', ''))
+    status, _, seats_taken = order_state(app, expired_id)
+    if int(retry_session['metadata']['order_id']) != expired_id or status != OrderStatus.PENDING or seats_taken != 2:
+        print(f"FAILURE: A superseded session left the retried order {status}.")
+        sys.exit(1)
+    print("SUCCESS: Expiry and cancel of a superseded session leave the retried order alone.")
+
+    gateway.deliver(stripe_hook, gateway.expired(retry_session))
+    status, _, seats_taken = order_state(app, expired_id)
+    if status == OrderStatus.FAILED and seats_taken == 1:
+        print("SUCCESS: checkout.session.expired fails the order and frees its seat.")
+    else:
+        print(f"FAILURE: Expired session left order {status} with {seats_taken} seats taken.")
+        sys.exit(1)
+
+    with app.app_context():
+        db.drop_all()
+
+if __name__ == "__main__":
+    try:
+        test_stripe_webhook()
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,20 @@
+"""Setup shared by the verify_*.py scripts."""
+from functools import partial
+from app.querybudget import query_budget
+from config import Config
+
+class VerifyConfig(Config):
+    # Throwaway in-memory database so the live instance/app.db is untouched
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+def logged_in(app, user_id):
+    """A test client whose session is logged in as user_id."""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+    return client
+
+def app_query_budget(app):
+    """query_budget bound to app, as the query_budget fixture in conftest.py yields it."""
+    return partial(query_budget, app)